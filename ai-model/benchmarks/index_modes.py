@@ -0,0 +1,78 @@
+"""
+Recall / latency benchmark for the FAISS index types and storages supported by utils.vector_index.
+Modes are "<index type>[:<storage>]", e.g. flat, hnsw, ivf:sq8, flat:pq.
+
+Run from the ai-model directory:
+    python -m benchmarks.index_modes --sizes 10000 50000 200000 --k 5
+    python -m benchmarks.index_modes --store "hf_vectorstores/Constitution of India"
+    python -m benchmarks.index_modes --modes flat flat:fp16 flat:sq8 flat:pq hnsw:sq8
+"""
+import argparse
+import time
+import numpy as np
+import faiss
+from utils.vector_index import build_index, load_vectorstore, store_vectors
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_vectors(count: int, dim: int = DIM, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered vectors, closer to real sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.3 * rng.normal(size=(count, dim)).astype(np.float32)
+
+
+def load_store_vectors(path: str) -> np.ndarray:
+    # Either on-disk format; flat mmap stores have no index.faiss, only their vector file
+    return store_vectors(load_vectorstore(path, None))
+
+
+def benchmark(vectors: np.ndarray, queries: np.ndarray, k: int, modes):
+    _, truth = build_index(vectors, "flat")[0].search(queries, k)
+    rows = []
+    for mode in modes:
+        index_type, _, storage = mode.partition(":")
+        started = time.perf_counter()
+        index, config = build_index(vectors, index_type, storage=storage or "float32")
+        build_time = time.perf_counter() - started
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i, query in enumerate(queries):
+            t0 = time.perf_counter()
+            _, ids = index.search(query[None, :], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found[i] = ids[0]
+
+        recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))])
+        label = f"{config['index_type']}:{config['storage']}"
+        rows.append((label, build_time, faiss.serialize_index(index).nbytes / 1e6, recall, np.percentile(latencies, 50), np.percentile(latencies, 95)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--store", help="Benchmark vectors from an existing vectorstore directory instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["flat", "ivf", "hnsw"])
+    args = parser.parse_args()
+
+    datasets = [(args.store, load_store_vectors(args.store))] if args.store else [
+        (f"synthetic-{n}", synthetic_vectors(n)) for n in args.sizes
+    ]
+
+    print(f"{'corpus':<40} {'mode':<14} {'build s':>8} {'MB':>8} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, vectors in datasets:
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(0, len(vectors), size=args.queries)]
+        queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+        for mode, build_time, size_mb, recall, p50, p95 in benchmark(vectors, queries, args.k, args.modes):
+            print(f"{name:<40} {mode:<14} {build_time:>8.2f} {size_mb:>8.2f} {recall:>9.3f} {p50:>8.3f} {p95:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
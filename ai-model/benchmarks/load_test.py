@@ -0,0 +1,84 @@
+"""
+Concurrency load test against a running API: throughput and latency per number of concurrent clients.
+With the event loop free, requests/sec should grow with clients until the stage limits are reached
+instead of staying flat (serialized).
+
+Start the API, then run from the ai-model directory:
+    python -m benchmarks.load_test --endpoint /chat --clients 1 2 4 8 16
+    python -m benchmarks.load_test --endpoint /ask-existing --requests 64
+    python -m benchmarks.load_test --endpoint /ask-context --field file_id=<md5 of an uploaded pdf>
+"""
+import time
+import argparse
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+QUERIES = [
+    "What is the punishment for murder?",
+    "Explain the right to equality.",
+    "What are the grounds for divorce?",
+    "What does the constitution say about freedom of speech?",
+    "What is the procedure to file an FIR?",
+]
+
+
+def send(url: str, fields: dict, timeout: float):
+    body = urllib.parse.urlencode(fields).encode("utf-8")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body), timeout=timeout) as response:
+            response.read()
+            ok = response.status == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run_level(url: str, clients: int, requests: int, extra: dict, unique: bool, timeout: float):
+    def job(i):
+        query = QUERIES[i % len(QUERIES)]
+        if unique:
+            # Distinct wording per request so the semantic answer cache does not short-circuit the LLM
+            query = f"{query} (load test request {time.time_ns()}-{i})"
+        return send(url, {"query": query, **extra}, timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(job, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok in results if ok]
+    errors = sum(1 for _, ok in results if not ok)
+    if not latencies:
+        return clients, elapsed, 0.0, float("nan"), float("nan"), errors
+    return (clients, elapsed, len(latencies) / elapsed,
+            np.percentile(latencies, 50), np.percentile(latencies, 95), errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/chat")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--field", action="append", default=[], help="Extra form field, e.g. file_id=abc")
+    parser.add_argument("--repeat-queries", action="store_true", help="Allow answer-cache hits")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    extra = dict(field.split("=", 1) for field in args.field)
+    url = args.url.rstrip("/") + args.endpoint
+    print(f"{'clients':>8} {'time s':>8} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'errors':>7} {'speedup':>8}")
+    baseline = None
+    for clients in args.clients:
+        clients, elapsed, throughput, p50, p95, errors = run_level(
+            url, clients, args.requests, extra, not args.repeat_queries, args.timeout)
+        baseline = baseline or throughput
+        speedup = throughput / baseline if baseline else 0.0
+        print(f"{clients:>8} {elapsed:>8.2f} {throughput:>8.2f} {p50:>8.2f} {p95:>8.2f} {errors:>7} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
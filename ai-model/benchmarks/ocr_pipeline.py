@@ -0,0 +1,112 @@
+"""
+Scanned-PDF OCR benchmark: the old whole-document convert_from_path + serial pytesseract path versus
+the page-streaming process pool in utils.ocr. A synthetic image-only PDF is generated with PIL.
+Each mode runs in a fresh subprocess so peak RSS (ru_maxrss, including OCR workers) is comparable.
+
+Run from the ai-model directory (needs poppler and tesseract on PATH):
+    python -m benchmarks.ocr_pipeline --pages 60 --dpi 200
+    python -m benchmarks.ocr_pipeline --pdf "data/some scanned file.pdf" --workers 1 2 4 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+LINES = [
+    "IN THE COURT OF THE CHIEF JUDICIAL MAGISTRATE",
+    "CHARGE SHEET UNDER SECTION 173 CR.P.C.",
+    "The accused is charged with offences punishable under sections 420 and 468 IPC.",
+    "Statement of witness recorded on the date mentioned above in the presence of the investigating officer.",
+    "The complainant stated that the amount was transferred on the assurance of repayment within thirty days.",
+]
+
+
+def make_scanned_pdf(path: str, pages: int, dpi: int = 200):
+    """Image-only PDF: each page is a rendered bitmap of text, like a scan, with no text layer."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", size=dpi // 8)
+    except OSError:
+        font = ImageFont.load_default()
+    images = []
+    for page in range(pages):
+        image = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(image)
+        y = dpi // 2
+        draw.text((dpi // 2, y), f"Page {page + 1}", fill=0, font=font)
+        for i in range(40):
+            y += dpi // 5
+            draw.text((dpi // 2, y), LINES[(page + i) % len(LINES)], fill=0, font=font)
+        images.append(image)
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+
+
+def run_mode(pdf_path: str, mode: str, workers: int, dpi: int) -> dict:
+    started = time.perf_counter()
+    if mode == "serial":
+        from pdf2image import convert_from_path
+        import pytesseract
+        text = ""
+        for image in convert_from_path(pdf_path, dpi=dpi):
+            text += pytesseract.image_to_string(image)
+        characters = len(text)
+    else:
+        os.environ["OCR_WORKERS"] = str(workers)
+        from utils.ocr import ocr_pdf_pages
+        characters = sum(len(text) for _, text in ocr_pdf_pages(pdf_path, dpi=dpi))
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss is in KiB on Linux
+    return {
+        "seconds": elapsed,
+        "characters": characters,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Benchmark an existing scanned PDF instead of a synthetic one")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--skip-serial", action="store_true")
+    parser.add_argument("--run", nargs=3, metavar=("PDF", "MODE", "WORKERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        pdf_path, mode, workers = args.run
+        print(json.dumps(run_mode(pdf_path, mode, int(workers), args.dpi)))
+        return
+
+    pdf_path = args.pdf
+    if pdf_path is None:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "synthetic_scan.pdf")
+        make_scanned_pdf(pdf_path, args.pages, args.dpi)
+        print(f"Synthetic scanned PDF: {args.pages} pages at {args.dpi} dpi")
+
+    modes = ([] if args.skip_serial else [("serial", 1)]) + [("pipeline", w) for w in args.workers]
+    print(f"{'mode':<10} {'workers':>7} {'seconds':>8} {'pages/s':>8} {'chars':>9} {'rss MB':>8} {'child MB':>9}")
+    pages = args.pages
+    if args.pdf:
+        from utils.ocr import page_count
+        pages = page_count(pdf_path)
+    for mode, workers in modes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.ocr_pipeline", "--dpi", str(args.dpi), "--run", pdf_path, mode, str(workers)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<10} {workers:>7} {result['seconds']:>8.2f} {pages / result['seconds']:>8.2f} "
+              f"{result['characters']:>9} {result['peak_rss_mb']:>8.0f} {result['peak_child_rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Text-layer extraction benchmark for the backends in utils.pdf_extraction over the PDFs in data/.
+Each backend runs in a fresh subprocess, so peak RSS (ru_maxrss) is per backend, not cumulative.
+
+Run from the ai-model directory:
+    python -m benchmarks.pdf_extraction
+    python -m benchmarks.pdf_extraction --backends pymupdf pypdf pymupdf+blocks --pdfs data/penal_code.pdf
+"""
+import sys
+import glob
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+
+def run_backend(backend: str, paths):
+    from utils.pdf_extraction import get_backend, load_pdf
+
+    name, _, option = backend.partition("+")
+    started = time.perf_counter()
+    pages = characters = 0
+    for path in paths:
+        docs = load_pdf(path, backend=name, include_blocks=option == "blocks")
+        pages += len(docs)
+        characters += sum(len(doc.page_content) for doc in docs)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    return {"backend": get_backend(name).name, "seconds": elapsed, "pages": pages, "characters": characters,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", nargs="+", default=sorted(glob.glob("data/*.pdf")))
+    parser.add_argument("--backends", nargs="+", default=["pypdf", "pymupdf", "pymupdf+blocks"])
+    parser.add_argument("--run", metavar="BACKEND", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_backend(args.run, args.pdfs)))
+        return
+
+    print(f"{len(args.pdfs)} PDFs")
+    print(f"{'backend':<16} {'pages':>6} {'seconds':>8} {'pages/s':>9} {'chars':>10} {'peak MB':>8}")
+    for backend in args.backends:
+        completed = subprocess.run([sys.executable, "-m", "benchmarks.pdf_extraction", "--run", backend,
+                                    "--pdfs", *args.pdfs], capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend:<16} failed: {completed.stderr.strip().splitlines()[-1]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if result["backend"] != backend.partition("+")[0]:
+            backend = f"{backend}->{result['backend']}"  # requested backend not installed
+        print(f"{backend:<16} {result['pages']:>6} {result['seconds']:>8.2f} "
+              f"{result['pages'] / result['seconds']:>9.1f} {result['characters']:>10} {result['peak_rss_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
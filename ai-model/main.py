@@ -1,14 +1,15 @@
 import os
 import tempfile
+import asyncio
 import hashlib
-import re
-from typing import Dict
+import time
+import json
+from typing import Dict, List
 from fastapi import FastAPI, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter, CharacterTextSplitter
-from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain.chains import RetrievalQA
 from langchain.vectorstores.base import VectorStore
@@ -16,9 +17,31 @@ from langchain.vectorstores.base import VectorStore
 # from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from utils.clause_extractor import ClauseExtractor
+from utils.corpus_index import CorpusIndex
+from utils.embedding_cache import CachedEmbeddings
+from utils.chunk_store import ALIASES_FILE, ChunkEmbeddingStore, StoreAliases, content_fingerprint
+from utils.answer_cache import SemanticAnswerCache
+from utils.vector_index import (
+    atomic_directory, build_vectorstore, save_vectorstore, load_vectorstore, store_document, store_size,
+)
+from utils.lexical_index import LexicalIndex, ensure_lexical_index
+from utils.hybrid_retriever import HYBRID_CANDIDATES, HYBRID_RETRIEVAL, make_retriever
+from utils.citation_index import CitationIndex
+from utils.reranker import CrossEncoderReranker
+from utils.vectorstore_cache import VectorStoreCache
+from utils.single_flight import SingleFlight
+from utils.page_router import route_pages
+from utils.pdf_extraction import blocks_in_span, load_pdf
+from utils.document_cache import ParsedDocumentCache
+from utils.clause_cache import ClauseResultCache
+from utils.ingestion_queue import IngestionQueue, QueueFullError
+from utils.llm_pool import llm_clients
+from utils.concurrency import ainvoke_llm, arun_chain, embed_stage, parse_stage, stage_stats
+from utils.streaming import (
+    MarkdownStreamCleaner, sse_event, sse_response, stream_error, stream_llm_answer, stream_retrieval_qa, stream_text,
+)
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.document_loaders import PyPDFLoader, UnstructuredPDFLoader
-from pdf2image import convert_from_path
+from langchain_community.document_loaders import PyPDFLoader
 import pytesseract
 
 # Load environment variables
@@ -53,17 +76,110 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Directory for on-disk caches (set CACHE_DIR="" to keep caches in memory only)
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+# Chunk embeddings are content-addressed, so re-uploaded or edited documents only embed new chunks
+chunk_store = ChunkEmbeddingStore(os.path.join(CACHE_DIR, "chunk_embeddings.sqlite"), EMBEDDING_MODEL) if CACHE_DIR else None
+
+# Query embeddings are cached so repeated questions skip the MiniLM forward pass
+embeddings = CachedEmbeddings(
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+    cache_dir=CACHE_DIR or None,
+    document_store=chunk_store,
+)
+
+# Per-page text of every parsed upload, keyed by file hash, so a PDF is only parsed (and OCR'd) once
+parsed_documents = ParsedDocumentCache(os.path.join(CACHE_DIR, "parsed_documents.sqlite")) if CACHE_DIR else None
+# One in-flight parse per file hash
+document_parses = SingleFlight()
+
+# Clause extraction results, so repeated templates and both sides of /compare-clauses skip Gemini
+clause_results = ClauseResultCache(
+    os.path.join(CACHE_DIR, "clause_results.sqlite"),
+    max_entries=int(os.getenv("CLAUSE_CACHE_SIZE", "500")),
+) if CACHE_DIR else None
 
 # Path to save vectorstores
 VECTORSTORE_DIR = "hf_vectorstores"
 os.makedirs(VECTORSTORE_DIR, exist_ok=True)
 
+# file_id -> canonical store and content fingerprint -> store, so duplicate documents share one directory
+store_aliases = StoreAliases(os.path.join(VECTORSTORE_DIR, ALIASES_FILE))
+# One in-flight build per content fingerprint
+store_builds = SingleFlight()
+
+# FAISS index type per store ("flat", "ivf" or "hnsw"), e.g. VECTORSTORE_INDEX_TYPES='{"IPC": "hnsw"}'
+DEFAULT_INDEX_TYPE = os.getenv("VECTORSTORE_INDEX_TYPE", "flat")
+STORE_INDEX_TYPES: Dict[str, str] = json.loads(os.getenv("VECTORSTORE_INDEX_TYPES", "{}"))
+CORPUS_INDEX_TYPE = os.getenv("CORPUS_INDEX_TYPE", "flat")
+
+# Vector storage per store ("float32", "fp16", "sq8" or "pq"); quantized stores re-rank against vectors.npy
+DEFAULT_STORAGE = os.getenv("VECTORSTORE_STORAGE", "float32")
+STORE_STORAGES: Dict[str, str] = json.loads(os.getenv("VECTORSTORE_STORAGES", "{}"))
+CORPUS_INDEX_STORAGE = os.getenv("CORPUS_INDEX_STORAGE", "float32")
+
+# On-disk format for new stores: "mmap" (pickle-free, memory-mapped) or "faiss" (index.faiss + index.pkl)
+VECTORSTORE_FORMAT = os.getenv("VECTORSTORE_FORMAT", "mmap")
+
 # -------------------------------
 # Caches
 # -------------------------------
-vectorstore_cache: Dict[str, VectorStore] = {}
+def load_cached_vectorstore(name: str):
+    """Loader used by vectorstore_cache to (re)load a store from VECTORSTORE_DIR."""
+    save_path = os.path.join(VECTORSTORE_DIR, name)
+    if not os.path.exists(save_path):
+        return None
+    vectorstore = load_vectorstore(save_path, embeddings)
+    if vectorstore is not None and HYBRID_RETRIEVAL and hasattr(vectorstore, "search_ids"):
+        # Attach BM25 postings now so the cache counts them against its byte budget
+        ensure_lexical_index(vectorstore, save_path)
+    return vectorstore
+
+
+# Uploaded stores are evicted under the byte budget; predefined legal stores are pinned
+vectorstore_cache = VectorStoreCache(
+    loader=load_cached_vectorstore,
+    max_bytes=int(os.getenv("VECTORSTORE_CACHE_BYTES", str(1024 ** 3))),
+    policy=os.getenv("VECTORSTORE_CACHE_POLICY", "lru"),
+)
 legal_docs_store: Dict[str, VectorStore] = {}  # For /ask-existing
+# Unified index over legal_docs_store
+corpus_index = CorpusIndex(
+    embeddings,
+    index_type=CORPUS_INDEX_TYPE,
+    storage=CORPUS_INDEX_STORAGE,
+    hybrid=HYBRID_RETRIEVAL,
+    candidates=HYBRID_CANDIDATES,
+)
+# Provision identifier ("ipc:section:302", "constitution:article:21") -> corpus chunk ids
+citation_index = CitationIndex()
+CITATION_INDEX_PATH = os.path.join(VECTORSTORE_DIR, "citations.json")
+CITATION_CONTEXT_K = 2  # extra vector-search chunks added around a cited provision
+
+# Optional cross-encoder re-ranking: over-fetch RERANK_CANDIDATES chunks, keep the best RERANK_TOP_N
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+reranker = CrossEncoderReranker(
+    model_name=os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+    top_n=int(os.getenv("RERANK_TOP_N", "4")),
+    budget_ms=float(os.getenv("RERANK_BUDGET_MS", "250")),
+) if RERANK_ENABLED else None
+
+# Final answers for /ask-existing and /chat, reused for near-identical questions.
+# Bump the prompt versions whenever the corresponding prompt text changes.
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+)
+ASK_EXISTING_PROMPT_VERSION = "v1"
+CHAT_PROMPT_VERSION = "v1"
+CHAT_MARKDOWN_PROMPT_VERSION = "v1"
 
 
 # -------------------------------
@@ -76,43 +192,49 @@ def file_hash(file_bytes):
 # Utility: Clean AI response
 # -------------------------------
 def clean_ai_response(response: str) -> str:
-    """Clean and normalize AI response for Markdown rendering in ReactMarkdown."""
-    cleaned = response.strip()
-
-    # 1️⃣ Collapse excessive blank lines
-    cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
-
-    # 2️⃣ Remove trailing spaces
-    cleaned = re.sub(r'[ \t]+$', '', cleaned, flags=re.MULTILINE)
-
-    # 3️⃣ Ensure numbered items like "5. ### ..." appear on their own lines
-    cleaned = re.sub(r'(\d+)\.\s*###\s*', r'\n\n\1. ### ', cleaned)
-
-    # 4️⃣ Ensure every "### Heading" starts on a new line
-    cleaned = re.sub(r'(?<!\n)\s*(### )', r'\n\n\1', cleaned)
-
-    # 5️⃣ Normalize bullets (replace * or + or • with "-")
-    cleaned = re.sub(r'^[*+•]\s+', '- ', cleaned, flags=re.MULTILINE)
-
-    # 6️⃣ Ensure numbered lists are clean and spaced correctly (e.g., "1.Item" → "1. Item")
-    cleaned = re.sub(r'(\d+)\.(?=[^\s])', r'\1. ', cleaned)
-
-    # 7️⃣ Remove Markdown heading duplicates (e.g., repeated "### ###")
-    cleaned = re.sub(r'(###\s+){2,}', r'### ', cleaned)
+    """
+    Clean and normalize AI response for Markdown rendering in ReactMarkdown.
+    Runs line by line (see MarkdownStreamCleaner) so streamed answers come out identical.
+    """
+    return MarkdownStreamCleaner.clean(response)
 
-    return cleaned
 
+# -------------------------------
+# Utility: Gemini Flash for grounded answers
+# -------------------------------
+def flash_llm():
+    return llm_clients.get(
+        "models/gemini-2.5-flash",
+        GEMINI_API_KEY,
+        model_kwargs={
+            "temperature": 0.2,  # Lower temperature for more consistent formatting
+            "top_p": 0.8,
+            "top_k": 40,
+            "max_output_tokens": 2048,
+        },
+    )
 
 
 # -------------------------------
 # Utility: Create FAISS vectorstore safely
 # -------------------------------
-def create_faiss_vectorstore_safe(chunks, embeddings, name: str = None):
+def create_faiss_vectorstore_safe(chunks, embeddings, name: str = None, index_type: str = None, storage: str = None):
     try:
-        vs = FAISS.from_documents(chunks, embeddings)
+        index_type = index_type or STORE_INDEX_TYPES.get(name, DEFAULT_INDEX_TYPE)
+        storage = storage or STORE_STORAGES.get(name, DEFAULT_STORAGE)
+        vs = build_vectorstore(chunks, embeddings, index_type, storage=storage)
+        # BM25 postings are built from the same chunks, row-aligned with the vectors
+        lexical = LexicalIndex.build([chunk.page_content for chunk in chunks])
         if name:
             save_path = os.path.join(VECTORSTORE_DIR, name)
-            vs.save_local(save_path)
+            # Written under a temporary name and renamed into place, so loaders never see a partial store
+            with atomic_directory(save_path) as tmp_path:
+                save_vectorstore(vs, tmp_path, fmt=VECTORSTORE_FORMAT)
+                lexical.save(tmp_path)
+            if VECTORSTORE_FORMAT == "mmap":
+                # Serve from the mmap'd copy so the in-memory docstore can be released
+                vs = load_vectorstore(save_path, embeddings)
+        vs.lexical_index = lexical
         return vs
     except Exception as e:
         print(f"⚠️ Failed to embed documents: {e}")
@@ -137,14 +259,21 @@ def smart_chunk_splitter(docs):
             chunk_size = 1000
             chunk_overlap = 120
 
+        # Block offsets refer to the page text; each chunk keeps only its own blocks, rebased to the chunk
+        blocks = doc.metadata.get("blocks")
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ".", " ", ""]
+            separators=["\n\n", "\n", ".", " ", ""],
+            add_start_index=blocks is not None
         )
 
         # Always split each document individually
         chunks = splitter.split_documents([doc])
+        if blocks is not None:
+            for chunk in chunks:
+                start = chunk.metadata.pop("start_index")
+                chunk.metadata["blocks"] = blocks_in_span(blocks, start, start + len(chunk.page_content))
         final_chunks.extend(chunks)
 
     return final_chunks
@@ -210,10 +339,9 @@ async def preload_legal_documents():
 
         if os.path.exists(save_path):
             print(f"✅ Loading cached HuggingFace vectorstore for: {name}")
-            vectorstore = FAISS.load_local(save_path, embeddings, allow_dangerous_deserialization=True)
+            vectorstore = load_cached_vectorstore(name)
         else:
-            loader = PyPDFLoader(path)
-            docs = loader.load()
+            docs = load_pdf(path)
             chunks = smart_chunk_splitter(docs)
 
             for chunk in chunks:
@@ -223,7 +351,15 @@ async def preload_legal_documents():
 
         if vectorstore:
             legal_docs_store[name] = vectorstore
-
+            vectorstore_cache.put(name, vectorstore, pinned=True)
+            if store_aliases.fingerprint_of(name) is None:
+                texts = (store_document(vectorstore, i).page_content for i in range(store_size(vectorstore)))
+                store_aliases.register_content(content_fingerprint(texts), name)
+
+    corpus_index.build(legal_docs_store)
+    citation_index.load_or_build(CITATION_INDEX_PATH, corpus_index)
+    if reranker:
+        reranker.load()
     print("✅ HuggingFace legal documents preloaded.")
 
 # -------------------------------
@@ -329,92 +465,98 @@ Give your full analysis below:
     except Exception as e:
         return {"error": f"Failed to analyze defense strategy: {str(e)}"}
 
-@app.post("/defend-case")
-async def defend_case(file: UploadFile = None, case_description: str = Form(None)):
-    """
-    Analyze the uploaded legal case or provided description
-    and suggest possible defense strategies in Markdown format.
-    """
-    try:
-        case_text = ""
+def _parse_uploaded_pdf(file_bytes: bytes, file_id: str, progress=None) -> List[Document]:
+    cached = parsed_documents.get(file_id) if parsed_documents else None
+    if cached is not None:
+        print(f"📦 Using cached parse of {file_id} ({len(cached)} pages)")
+        return cached
 
-        # ----------------------------
-        # 🧾 1. PDF File Input Handling
-        # ----------------------------
-        if file:
-            file_bytes = await file.read()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                tmp_file.write(file_bytes)
-                tmp_file_path = tmp_file.name
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(file_bytes)
+        tmp_file_path = tmp_file.name
+
+    try:
+        # Each page goes to the cheapest extractor that works: its text layer, or OCR for scanned/garbled pages
+        docs, routes = route_pages(tmp_file_path, source=file_id, progress=progress)
+        print(f"✅ Extracted {len(docs)} pages ({routes['text']} text layer, {routes['image'] + routes['garbage']} OCR).")
 
-            docs = []
+        # Nothing readable locally
+        if not docs:
+            print("❌ No text from text layer or OCR — trying Gemini OCR fallback...")
             try:
-                loader = PyPDFLoader(tmp_file_path)
-                docs = loader.load()
-                print(f"✅ PyPDFLoader extracted {len(docs)} pages.")
+                from google import genai
+                client = genai.Client(api_key=GEMINI_API_KEY)
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=[
+                        {"mime_type": "application/pdf", "data": file_bytes},
+                        {"text": "Extract readable text from this scanned PDF document."}
+                    ]
+                )
+                text = response.text.strip()
             except Exception as e:
-                print(f"⚠️ PyPDFLoader failed: {e}")
+                raise ValueError(f"OCR and Gemini fallback failed: {str(e)}")
+            if not text:
+                raise ValueError("Gemini OCR also failed to extract text.")
+            print("✅ Gemini OCR extracted text successfully.")
+            docs = [Document(page_content=text, metadata={"extraction": "gemini"})]
+            routes = {**routes, "gemini": 1}
+    finally:
+        os.unlink(tmp_file_path)
 
-            # Try UnstructuredPDFLoader if PyPDF fails or extracts no text
-            if not docs or len("".join([d.page_content for d in docs]).strip()) == 0:
-                print("⚠️ No text from PyPDFLoader — trying UnstructuredPDFLoader...")
-                try:
-                    from langchain_community.document_loaders import UnstructuredPDFLoader
-                    loader = UnstructuredPDFLoader(tmp_file_path)
-                    docs = loader.load()
-                    print(f"✅ UnstructuredPDFLoader extracted {len(docs)} pages.")
-                except Exception as e:
-                    print(f"⚠️ UnstructuredPDFLoader failed: {e}")
-
-            # Try OCR if both loaders fail
-            if not docs or len("".join([d.page_content for d in docs]).strip()) == 0:
-                print("🧠 Performing OCR on scanned PDF...")
-                case_text = extract_text_with_ocr(tmp_file_path)
-                if not case_text.strip():
-                    print("❌ OCR process failed — trying Gemini OCR fallback...")
-                    try:
-                        from google import genai
-                        client = genai.Client(api_key=GEMINI_API_KEY)
-                        with open(tmp_file_path, "rb") as f:
-                            response = client.models.generate_content(
-                                model="gemini-2.0-flash",
-                                contents=[
-                                    {"mime_type": "application/pdf", "data": f.read()},
-                                    {"text": "Extract readable text from this scanned PDF document."}
-                                ]
-                            )
-                        case_text = response.text.strip()
-                        print("✅ Gemini OCR extracted text successfully.")
-                    except Exception as e:
-                        print(f"❌ Gemini OCR fallback failed: {e}")
-                        return {"error": "Failed to extract text from PDF (OCR + Gemini fallback failed)."}
-
-            else:
-                # If text successfully extracted via loaders
-                case_text = "\n".join([d.page_content for d in docs])
+    if parsed_documents is not None:
+        parsed_documents.put(file_id, docs, routes)
+    return docs
 
-            os.unlink(tmp_file_path)
 
-        # ----------------------------
-        # 📝 2. Case Description Input
-        # ----------------------------
-        elif case_description:
-            case_text = case_description.strip()
+def parse_uploaded_pdf(file_bytes: bytes, progress=None) -> List[Document]:
+    """
+    Per-page Documents for an uploaded PDF (text layer or OCR per page, then Gemini OCR), from the
+    parsed-document cache when the same file was seen before. Raises ValueError if nothing is readable.
+    """
+    file_id = file_hash(file_bytes)
+    return document_parses.do(file_id, _parse_uploaded_pdf, file_bytes, file_id, progress)
 
-        else:
-            return {"error": "Please upload a PDF or provide a case description."}
 
-        # ----------------------------
-        # 🚧 3. Validate Extracted Text
-        # ----------------------------
-        if not case_text or len(case_text.strip()) < 50:
-            print("⚠️ Extracted text too short or empty.")
-            return {"error": "Case text is too short or could not be extracted properly."}
+def extract_case_text(file_bytes: bytes) -> str:
+    """Full text of a /defend-case upload."""
+    return "\n".join(doc.page_content for doc in parse_uploaded_pdf(file_bytes))
 
-        # ----------------------------
-        # ⚖️ 4. Prepare Legal Defense Prompt
-        # ----------------------------
-        prompt = f"""
+
+async def build_defense_prompt(file: UploadFile = None, case_description: str = None):
+    """Extract the case text and build the defense prompt; returns an error dict if there is no usable text."""
+    case_text = ""
+
+    # ----------------------------
+    # 🧾 1. PDF File Input Handling
+    # ----------------------------
+    if file:
+        file_bytes = await file.read()
+        try:
+            case_text = await parse_stage.run(extract_case_text, file_bytes)
+        except ValueError as e:
+            return {"error": str(e)}
+
+    # ----------------------------
+    # 📝 2. Case Description Input
+    # ----------------------------
+    elif case_description:
+        case_text = case_description.strip()
+
+    else:
+        return {"error": "Please upload a PDF or provide a case description."}
+
+    # ----------------------------
+    # 🚧 3. Validate Extracted Text
+    # ----------------------------
+    if not case_text or len(case_text.strip()) < 50:
+        print("⚠️ Extracted text too short or empty.")
+        return {"error": "Case text is too short or could not be extracted properly."}
+
+    # ----------------------------
+    # ⚖️ 4. Prepare Legal Defense Prompt
+    # ----------------------------
+    prompt = f"""
 You are an expert Indian defense lawyer and legal strategist.
 Analyze the following case details and explain in Markdown how the defendant could prepare their defense.
 
@@ -448,21 +590,35 @@ If the response is lengthy, please complete it fully — do not stop mid-sentenc
 
 Give your full analysis below:
 """
+    return prompt
 
 
+def defense_llm():
+    return llm_clients.get(
+        "models/gemini-2.5-flash",
+        GEMINI_API_KEY,
+        temperature=0.3,
+        top_p=0.9,
+        top_k=40,
+        max_output_tokens=8192,
+    )
+
+
+@app.post("/defend-case")
+async def defend_case(file: UploadFile = None, case_description: str = Form(None)):
+    """
+    Analyze the uploaded legal case or provided description
+    and suggest possible defense strategies in Markdown format.
+    """
+    try:
+        prompt = await build_defense_prompt(file, case_description)
+        if isinstance(prompt, dict):
+            return prompt
+
         # ----------------------------
         # 🤖 5. Invoke Gemini Model
         # ----------------------------
-        llm = ChatGoogleGenerativeAI(
-            model="models/gemini-2.5-flash",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.3,
-            top_p=0.9,
-            top_k=40,
-            max_output_tokens=8192,
-        )
-
-        response = llm.invoke(prompt)
+        response = await ainvoke_llm(defense_llm(), prompt)
         print("🧾 Gemini response received.")
 
         answer = (
@@ -483,27 +639,54 @@ Give your full analysis below:
         return {"error": f"Failed to analyze defense strategy: {str(e)}"}
 
 
+@app.post("/defend-case/stream")
+async def defend_case_stream(file: UploadFile = None, case_description: str = Form(None)):
+    """Server-sent-events variant of /defend-case; the strategy is streamed as it is generated."""
+    try:
+        prompt = await build_defense_prompt(file, case_description)
+    except Exception as e:
+        print(f"❌ Exception in /defend-case/stream: {e}")
+        return sse_response(stream_error(f"Failed to analyze defense strategy: {str(e)}"))
+    if isinstance(prompt, dict):
+        return sse_response(stream_error(prompt["error"]))
+    return sse_response(stream_llm_answer(defense_llm(), prompt))
+
+
 # -------------------------------
 # /ask-existing: Ask from preloaded legal docs
 # -------------------------------
-@app.post("/ask-existing")
-async def ask_from_existing(query: str = Form(...)):
-    if not legal_docs_store:
-        return {"error": "Legal documents not loaded yet."}
-
+async def retrieve_existing_context(query: str, source_filter=None):
+    """Gather excerpts for /ask-existing; returns (prompt, response metadata) or None if nothing matched."""
+    # Exact citation fast path: "section 420 IPC" / "Article 370" resolve straight to the provision's chunks
+    citations = citation_index.lookup(query, source_filter)
     all_matches = []
-    for name, vectorstore in legal_docs_store.items():
-        results = vectorstore.similarity_search_with_score(query, k=5)
-        for doc, score in results:
-            if doc and score is not None:
-                all_matches.append({
-                    "source": doc.metadata.get("source", name),
-                    "content": doc.page_content,
-                    "score": score
-                })
+    for key, entry in citations:
+        for global_id in entry["chunks"]:
+            doc = corpus_index.get_document(global_id)
+            all_matches.append({
+                "source": doc.metadata.get("source", corpus_index.source_of(global_id)),
+                "content": doc.page_content,
+                "score": 0.0
+            })
+
+    # One query embedding + one search over the unified corpus index (only extra context when cited)
+    seen = {m["content"] for m in all_matches}
+    context_k = CITATION_CONTEXT_K if citations else 5
+    hits = await embed_stage.run(corpus_index.search, query, k=RERANK_CANDIDATES if reranker else context_k,
+                                 sources=source_filter)
+    hits = [hit for hit in hits if hit[0].page_content not in seen]
+    if reranker:
+        hits = await embed_stage.run(reranker.rerank, query, hits, lambda hit: hit[0].page_content,
+                                     top_n=min(context_k, reranker.top_n))
+    for doc, score, source in hits:
+        all_matches.append({
+            "source": source,
+            "content": doc.page_content,
+            "score": score
+        })
 
     if not all_matches:
-        return {"error": "No relevant information found."}
+        return None
 
     from collections import defaultdict
     source_scores = defaultdict(list)
@@ -511,8 +694,9 @@ async def ask_from_existing(query: str = Form(...)):
         source_scores[match["source"]].append(match["score"])
 
     best_source = min(source_scores, key=lambda s: sum(source_scores[s]) / len(source_scores[s]))
-    best_chunks = [m["content"] for m in all_matches if m["source"] == best_source]
-    combined_text = "\n\n".join(best_chunks)
+    # Every matched excerpt goes into the prompt, tagged with its document, so one answer can draw on
+    # several Acts (a cited IPC section and a Constitution article); "source" names the best-scoring one
+    combined_text = "\n\n".join(f"[Source: {m['source']}]\n{m['content']}" for m in all_matches)
 
     prompt = f"""
 You are a professional AI legal research assistant for an online legal platform. 
@@ -550,35 +734,68 @@ Please provide a comprehensive yet concise response, ideally between 400 and 700
 Answer in a clear, structured, legally accurate way:
 """
 
-    llm = ChatGoogleGenerativeAI(
-    model="models/gemini-2.5-flash",
-    google_api_key=GEMINI_API_KEY,
-    model_kwargs={
-        "temperature": 0.2,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 2048,
+    metadata = {
+        "source": best_source,
+        "sources": list(source_scores),
+        "citations": [{"id": key, "title": entry["title"], "pages": entry["pages"]} for key, entry in citations],
     }
-)
+    return prompt, metadata
+
+
+@app.post("/ask-existing")
+async def ask_from_existing(query: str = Form(...), sources: str = Form(None)):
+    if not legal_docs_store:
+        return {"error": "Legal documents not loaded yet."}
 
-    response = llm.invoke(prompt)
+    # Optional comma-separated restriction, e.g. "IPC,Constitution of India"
+    source_filter = [s.strip() for s in sources.split(",") if s.strip()] if sources else None
+
+    query_vector = await embed_stage.run(embeddings.embed_query, query)
+    cache_namespace = answer_cache.namespace("ask-existing", ASK_EXISTING_PROMPT_VERSION, source_filter, query=query)
+    cached = answer_cache.lookup(cache_namespace, query_vector)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    context = await retrieve_existing_context(query, source_filter)
+    if context is None:
+        return {"error": "No relevant information found."}
+    prompt, metadata = context
+
+    llm = flash_llm()
+    started = time.perf_counter()
+    response = await ainvoke_llm(llm, prompt)
     answer = response.content if hasattr(response, 'content') else str(response)
     cleaned_answer = clean_ai_response(answer)
 
-    return {"answer": cleaned_answer, "source": best_source}
+    result = {"answer": cleaned_answer, **metadata}
+    answer_cache.store(cache_namespace, query_vector, result, time.perf_counter() - started)
+    return result
 
 
-def extract_text_with_ocr(pdf_path):
-    """Extract text from scanned PDF using OCR"""
-    try:
-        images = convert_from_path(pdf_path)
-        text = ""
-        for img in images:
-            text += pytesseract.image_to_string(img)
-        return text.strip()
-    except Exception as e:
-        print(f"❌ OCR process failed: {e}")
-        return ""
+@app.post("/ask-existing/stream")
+async def ask_from_existing_stream(query: str = Form(...), sources: str = Form(None)):
+    """Server-sent-events variant of /ask-existing; source metadata arrives in the final "done" event."""
+    if not legal_docs_store:
+        return sse_response(stream_error("Legal documents not loaded yet."))
+
+    source_filter = [s.strip() for s in sources.split(",") if s.strip()] if sources else None
+
+    query_vector = await embed_stage.run(embeddings.embed_query, query)
+    cache_namespace = answer_cache.namespace("ask-existing", ASK_EXISTING_PROMPT_VERSION, source_filter, query=query)
+    cached = answer_cache.lookup(cache_namespace, query_vector)
+    if cached is not None:
+        metadata = {key: value for key, value in cached.items() if key != "answer"}
+        return sse_response(stream_text(cached["answer"], {**metadata, "cached": True}))
+
+    context = await retrieve_existing_context(query, source_filter)
+    if context is None:
+        return sse_response(stream_error("No relevant information found."))
+    prompt, metadata = context
+
+    def remember(answer, latency):
+        answer_cache.store(cache_namespace, query_vector, {"answer": answer, **metadata}, latency)
+
+    return sse_response(stream_llm_answer(flash_llm(), prompt, done=metadata, on_complete=remember))
 
 
 # -------------------------------
@@ -637,104 +854,153 @@ def extract_text_with_ocr(pdf_path):
 
 #     return {"answer": cleaned_result, "file_id": file_id}
 
-@app.post("/ask-upload")
-async def ask_from_uploaded(query: str = Form(...), file: UploadFile = None):
+def ingest_uploaded_pdf(file_bytes: bytes, file_id: str, report=None):
+    """
+    Parse, chunk, embed and index an uploaded PDF. Returns (vectorstore, store_name);
+    raises ValueError when no text could be extracted or the store could not be built.
+    """
+    report = report or (lambda stage, progress: None)
+
+    report("extracting", 0.1)
+    docs = parse_uploaded_pdf(file_bytes, progress=lambda done, total: report("ocr", 0.2 + 0.4 * done / total))
+
+    report("chunking", 0.6)
+    chunks = smart_chunk_splitter(docs)
+
+    # Same content under a different file hash (re-saved PDF, duplicate upload) reuses the existing store
+    fingerprint = content_fingerprint(chunk.page_content for chunk in chunks)
+
+    def build():
+        canonical = store_aliases.find_content(fingerprint)
+        vectorstore = vectorstore_cache.get(canonical) if canonical else None
+        if vectorstore is not None:
+            return vectorstore, canonical
+
+        report("embedding", 0.7)
+        vectorstore = create_faiss_vectorstore_safe(chunks, embeddings, name=file_id)
+        if vectorstore is None:
+            raise ValueError("Failed to build the document index.")
+        store_aliases.register_content(fingerprint, file_id)
+        vectorstore_cache.put(file_id, vectorstore)
+        return vectorstore, file_id
+
+    # Concurrent uploads of the same content run one build; the others wait and alias to it
+    vectorstore, store_name = store_builds.do(fingerprint, build)
+    if store_name != file_id:
+        print(f"🔗 Upload {file_id} matches existing store {store_name}")
+        store_aliases.link(file_id, store_name)
+    return vectorstore, store_name
+
+
+INGEST_WAIT_TIMEOUT = float(os.getenv("INGEST_WAIT_TIMEOUT", "30"))
+ingestion_queue = IngestionQueue(
+    ingest_uploaded_pdf,
+    max_workers=int(os.getenv("INGEST_WORKERS", "2")),
+    max_pending=int(os.getenv("INGEST_MAX_PENDING", "32")),
+    is_ready=lambda file_id: os.path.isdir(os.path.join(VECTORSTORE_DIR, store_aliases.resolve(file_id))),
+    finished_ttl=float(os.getenv("INGEST_JOB_TTL", "3600")),
+)
+
+
+# -------------------------------
+# /ingest: Queue a PDF for background processing
+# -------------------------------
+@app.post("/ingest")
+async def ingest_document(file: UploadFile = None):
     if file is None:
         return {"error": "No file uploaded."}
 
     file_bytes = await file.read()
     file_id = file_hash(file_bytes)
-    save_path = os.path.join(VECTORSTORE_DIR, file_id)
+    if store_aliases.resolve(file_id) in vectorstore_cache or os.path.exists(
+            os.path.join(VECTORSTORE_DIR, store_aliases.resolve(file_id))):
+        return {"file_id": file_id, "status": "ready", "stage": "ready", "progress": 1.0}
 
-    if file_id in vectorstore_cache:
-        vectorstore = vectorstore_cache[file_id]
-    elif os.path.exists(save_path):
-        vectorstore = FAISS.load_local(save_path, embeddings, allow_dangerous_deserialization=True)
-        vectorstore_cache[file_id] = vectorstore
-    else:
-        # Save temp PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(file_bytes)
-            tmp_file_path = tmp_file.name
+    try:
+        return ingestion_queue.submit(file_id, file_bytes)
+    except QueueFullError as e:
+        return {"error": str(e), "file_id": file_id}
 
-        docs = []
-        try:
-            loader = PyPDFLoader(tmp_file_path)
-            docs = loader.load()
-        except Exception as e:
-            print(f"⚠️ PyPDFLoader failed: {e}")
-
-        # If no text, try UnstructuredPDFLoader
-        if not docs or len("".join([d.page_content for d in docs]).strip()) == 0:
-            print("⚠️ No text found with PyPDFLoader — trying UnstructuredPDFLoader...")
-            try:
-                loader = UnstructuredPDFLoader(tmp_file_path)
-                docs = loader.load()
-            except Exception as e:
-                print(f"⚠️ UnstructuredPDFLoader failed: {e}")
-
-        # If still empty, perform OCR
-        if not docs or len("".join([d.page_content for d in docs]).strip()) == 0:
-            print("🧠 Performing OCR on scanned PDF...")
-            ocr_text = extract_text_with_ocr(tmp_file_path)
-            if ocr_text:
-                docs = [Document(page_content=ocr_text)]
-            else:
-                print("❌ OCR process failed — trying Gemini OCR fallback...")
-                try:
-                    from google import genai
-                    client = genai.Client(api_key=GEMINI_API_KEY)
-                    with open(tmp_file_path, "rb") as f:
-                        response = client.models.generate_content(
-                            model="gemini-2.0-flash",
-                            contents=[
-                                {"mime_type": "application/pdf", "data": f.read()},
-                                {"text": "Extract readable text from this scanned PDF document."}
-                            ]
-                        )
-                    text = response.text.strip()
-                    if text:
-                        docs = [Document(page_content=text)]
-                    else:
-                        return {"error": "Gemini OCR also failed to extract text."}
-                except Exception as e:
-                    return {"error": f"OCR and Gemini fallback failed: {str(e)}"}
-
-        chunks = smart_chunk_splitter(docs)
-        vectorstore = create_faiss_vectorstore_safe(chunks, embeddings, name=file_id)
-        if vectorstore:
-            vectorstore_cache[file_id] = vectorstore
 
-        os.unlink(tmp_file_path)
+# -------------------------------
+# /ingest/{file_id}: Poll ingestion status
+# -------------------------------
+@app.get("/ingest/{file_id}")
+async def ingest_status(file_id: str):
+    job = ingestion_queue.status(file_id)
+    if job is not None:
+        return job
+    if os.path.exists(os.path.join(VECTORSTORE_DIR, store_aliases.resolve(file_id))):
+        return {"file_id": file_id, "status": "ready", "stage": "ready", "progress": 1.0}
+    return {"error": "Unknown file_id.", "file_id": file_id}
+
+
+async def load_uploaded_store(file_bytes: bytes):
+    """Vectorstore for an uploaded PDF, ingesting it first if needed; returns an error dict on failure."""
+    file_id = file_hash(file_bytes)
+    store_name = store_aliases.resolve(file_id)
 
-    # QA Chain
-    llm = ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-flash",
-        google_api_key=GEMINI_API_KEY,
-        model_kwargs={
-            "temperature": 0.2,
-            "top_p": 0.8,
-            "top_k": 40,
-            "max_output_tokens": 2048,
-        },
+    vectorstore = await parse_stage.run(vectorstore_cache.get, store_name)
+    if vectorstore is None:
+        # Parse/embed on the ingestion pool (joining an in-flight job for the same file) and await it
+        try:
+            ingestion_queue.submit(file_id, file_bytes)
+        except QueueFullError as e:
+            return {"error": str(e)}
+        job = await ingestion_queue.wait(file_id)
+        if job["status"] != "ready":
+            return {"error": job["error"] or "Failed to process the document."}
+        store_name = store_aliases.resolve(file_id)
+        vectorstore = await parse_stage.run(vectorstore_cache.get, store_name)
+        if vectorstore is None:
+            return {"error": "Processed document could not be loaded, please upload it again."}
+    return file_id, vectorstore, os.path.join(VECTORSTORE_DIR, store_name)
+
+
+def build_qa_chain(vectorstore, save_path: str):
+    return RetrievalQA.from_chain_type(
+        llm=flash_llm(),
+        retriever=make_retriever(vectorstore, save_path, reranker=reranker, fetch_k=RERANK_CANDIDATES),
     )
 
-    qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=vectorstore.as_retriever())
-    result = qa_chain.run(query)
+
+@app.post("/ask-upload")
+async def ask_from_uploaded(query: str = Form(...), file: UploadFile = None):
+    if file is None:
+        return {"error": "No file uploaded."}
+
+    store = await load_uploaded_store(await file.read())
+    if isinstance(store, dict):
+        return store
+    file_id, vectorstore, save_path = store
+
+    # QA Chain
+    qa_chain = build_qa_chain(vectorstore, save_path)
+    result = await arun_chain(qa_chain, query)
     cleaned_result = clean_ai_response(result)
 
     return {"answer": cleaned_result, "file_id": file_id}
 
 
+@app.post("/ask-upload/stream")
+async def ask_from_uploaded_stream(query: str = Form(...), file: UploadFile = None):
+    """Server-sent-events variant of /ask-upload."""
+    if file is None:
+        return sse_response(stream_error("No file uploaded."))
+
+    store = await load_uploaded_store(await file.read())
+    if isinstance(store, dict):
+        return sse_response(stream_error(store["error"]))
+    file_id, vectorstore, save_path = store
+    return sse_response(stream_retrieval_qa(build_qa_chain(vectorstore, save_path), query, done={"file_id": file_id}))
+
+
 
 # -------------------------------
 # /chat: General chat endpoint
 # -------------------------------
-@app.post("/chat")
-async def general_chat(query: str = Form(...)):
-    """General chat endpoint for conversational AI without specific document context"""
-    
-    prompt = f"""
+def build_chat_prompt(query: str) -> str:
+    return f"""
 You are a helpful AI legal assistant. Provide professional, accurate, and helpful legal guidance.
 Be conversational but maintain professionalism. If a question requires specific legal documents 
 or analysis, suggest the user upload a document or use the legal database.
@@ -746,17 +1012,47 @@ Please provide a comprehensive yet concise response, ideally between 400 and 700
 
 """
 
-    llm = ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-pro",
-        temperature=0.3,
-        google_api_key=GEMINI_API_KEY
-    )
-    response = llm.invoke(prompt)
+
+def chat_llm():
+    return llm_clients.get("models/gemini-2.5-pro", GEMINI_API_KEY, temperature=0.3)
+
+
+@app.post("/chat")
+async def general_chat(query: str = Form(...)):
+    """General chat endpoint for conversational AI without specific document context"""
+    
+    prompt = build_chat_prompt(query)
+
+    query_vector = await embed_stage.run(embeddings.embed_query, query)
+    cache_namespace = answer_cache.namespace("chat", CHAT_PROMPT_VERSION, query=query)
+    cached = answer_cache.lookup(cache_namespace, query_vector)
+    if cached is not None:
+        return {"response": cached, "cached": True}
+
+    llm = chat_llm()
+    started = time.perf_counter()
+    response = await ainvoke_llm(llm, prompt)
     answer = response.content if hasattr(response, 'content') else str(response)
     cleaned_answer = clean_ai_response(answer)
 
+    answer_cache.store(cache_namespace, query_vector, cleaned_answer, time.perf_counter() - started)
     return {"response": cleaned_answer}
 
+
+@app.post("/chat/stream")
+async def general_chat_stream(query: str = Form(...)):
+    """Server-sent-events variant of /chat."""
+    query_vector = await embed_stage.run(embeddings.embed_query, query)
+    cache_namespace = answer_cache.namespace("chat", CHAT_PROMPT_VERSION, query=query)
+    cached = answer_cache.lookup(cache_namespace, query_vector)
+    if cached is not None:
+        return sse_response(stream_text(cached, {"cached": True}))
+
+    def remember(answer, latency):
+        answer_cache.store(cache_namespace, query_vector, answer, latency)
+
+    return sse_response(stream_llm_answer(chat_llm(), build_chat_prompt(query), on_complete=remember))
+
 # -------------------------------
 # /chat: General chat endpoint
 # -------------------------------
@@ -791,22 +1087,20 @@ Please provide a comprehensive yet concise response, ideally between 400 and 700
 Answer:
 """
 
+    query_vector = await embed_stage.run(embeddings.embed_query, query)
+    cache_namespace = answer_cache.namespace("chat-markdown", CHAT_MARKDOWN_PROMPT_VERSION, query=query)
+    cached = answer_cache.lookup(cache_namespace, query_vector)
+    if cached is not None:
+        return {"response": cached, "cached": True}
 
-    llm = ChatGoogleGenerativeAI(
-    model="models/gemini-2.5-flash",
-    google_api_key=GEMINI_API_KEY,
-    model_kwargs={
-        "temperature": 0.2,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 2048,
-    }
-)
+    llm = flash_llm()
 
-    response = llm.invoke(prompt)
+    started = time.perf_counter()
+    response = await ainvoke_llm(llm, prompt)
     answer = response.content if hasattr(response, 'content') else str(response)
     cleaned_answer = clean_ai_response(answer)
 
+    answer_cache.store(cache_namespace, query_vector, cleaned_answer, time.perf_counter() - started)
     return {"response": cleaned_answer}
 
 # -------------------------------
@@ -820,41 +1114,85 @@ async def save_chat(chat_id: str = Form(...), user_message: str = Form(...), ai_
     return {"success": True, "chat_id": chat_id}
 
 # -------------------------------
-# /ask-context: Ask using file_id
+# /cache-stats: Cache hit/miss counters
 # -------------------------------
-@app.post("/ask-context")
-async def ask_from_context(query: str = Form(...), file_id: str = Form(...)):
-    if file_id not in vectorstore_cache:
-        save_path = os.path.join(VECTORSTORE_DIR, file_id)
-        if os.path.exists(save_path):
-            # embeddings = GoogleGenerativeAIEmbeddings(
-            #     model="models/embedding-001",
-            #     google_api_key=GEMINI_API_KEY
-            # )
-            vectorstore = FAISS.load_local(save_path, embeddings, allow_dangerous_deserialization=True)
-            vectorstore_cache[file_id] = vectorstore
-        else:
-            return {"error": "Context not found. Please upload the file first."}
-
-    vectorstore = vectorstore_cache[file_id]
-
-    llm = ChatGoogleGenerativeAI(
-    model="models/gemini-2.5-flash",
-    google_api_key=GEMINI_API_KEY,
-    model_kwargs={
-        "temperature": 0.2, # Lower temperature for more consistent formatting
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 2048,
+@app.get("/cache-stats")
+async def cache_stats():
+    return {
+        "query_embeddings": embeddings.stats(),
+        "answers": answer_cache.stats(),
+        "vectorstores": vectorstore_cache.stats(),
+        "chunk_embeddings": chunk_store.stats() if chunk_store else None,
+        "ingestion": ingestion_queue.stats(),
+        "stages": stage_stats(),
+        "llm_clients": llm_clients.stats(),
+        "store_builds": store_builds.stats(),
+        "parsed_documents": parsed_documents.stats() if parsed_documents else None,
+        "document_parses": document_parses.stats(),
+        "clause_results": clause_results.stats() if clause_results else None,
     }
-)
 
-    qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=vectorstore.as_retriever())
-    result = qa_chain.run(query)
+# -------------------------------
+# /ask-context: Ask using file_id
+# -------------------------------
+async def load_context_store(file_id: str, wait: bool = False):
+    """Vectorstore for a previously uploaded file_id; returns an error dict if it is not (yet) available."""
+    if ingestion_queue.is_pending(file_id):
+        if not wait:
+            return {**ingestion_queue.status(file_id), "error": "Document is still being processed."}
+        job = await ingestion_queue.wait(file_id, INGEST_WAIT_TIMEOUT)
+        if job["status"] != "ready":
+            return {**job, "error": "Document is not ready yet."}
+    job = ingestion_queue.status(file_id)
+    if job is not None and job["status"] == "failed":
+        return {**job, "error": f"Document processing failed: {job['error']}"}
+
+    store_name = store_aliases.resolve(file_id)
+    # Evicted stores reload transparently from hf_vectorstores
+    vectorstore = await parse_stage.run(vectorstore_cache.get, store_name)
+    if vectorstore is None:
+        return {"error": "Context not found. Please upload the file first."}
+    return vectorstore, os.path.join(VECTORSTORE_DIR, store_name)
+
+
+@app.post("/ask-context")
+async def ask_from_context(query: str = Form(...), file_id: str = Form(...), wait: bool = Form(False)):
+    store = await load_context_store(file_id, wait)
+    if isinstance(store, dict):
+        return store
+    vectorstore, save_path = store
+
+    qa_chain = build_qa_chain(vectorstore, save_path)
+    result = await arun_chain(qa_chain, query)
     cleaned_result = clean_ai_response(result)
 
     return {"answer": cleaned_result, "file_id": file_id}
 
+
+@app.post("/ask-context/stream")
+async def ask_from_context_stream(query: str = Form(...), file_id: str = Form(...), wait: bool = Form(False)):
+    """Server-sent-events variant of /ask-context."""
+    store = await load_context_store(file_id, wait)
+    if isinstance(store, dict):
+        return sse_response(stream_error(store["error"]))
+    vectorstore, save_path = store
+    return sse_response(stream_retrieval_qa(build_qa_chain(vectorstore, save_path), query, done={"file_id": file_id}))
+
+# -------------------------------
+# Utility: Shared clause extractor
+# -------------------------------
+_clause_extractor = None
+
+
+def get_clause_extractor() -> ClauseExtractor:
+    global _clause_extractor
+    if _clause_extractor is None:
+        _clause_extractor = ClauseExtractor(
+            api_key=GEMINI_API_KEY, document_cache=parsed_documents, result_cache=clause_results,
+            embeddings=embeddings,
+        )
+    return _clause_extractor
+
 # -------------------------------
 # /extract-clauses: Extract clauses from uploaded PDF
 # -------------------------------
@@ -872,8 +1210,8 @@ async def extract_clauses_from_pdf(file: UploadFile = None):
             tmp_file_path = tmp_file.name
 
         # Initialize clause extractor
-        extractor = ClauseExtractor(api_key=GEMINI_API_KEY)
-        result = extractor.extract_clauses_from_pdf(tmp_file_path)
+        extractor = get_clause_extractor()
+        result = await extractor.aextract_clauses_from_pdf(tmp_file_path)
         
         # Clean up temporary file
         os.unlink(tmp_file_path)
@@ -882,6 +1220,43 @@ async def extract_clauses_from_pdf(file: UploadFile = None):
     except Exception as e:
         return {"error": f"Failed to extract clauses: {str(e)}"}
 
+async def stream_clause_events(extractor: ClauseExtractor, file_bytes: bytes):
+    """SSE: one "clause" event per clause as the model finishes it, then "done" with the summary."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(file_bytes)
+        tmp_file_path = tmp_file.name
+
+    started = time.perf_counter()
+    first_clause = None
+    try:
+        async for event in extractor.astream_clauses_from_pdf(tmp_file_path):
+            if "clause" in event:
+                first_clause = first_clause or time.perf_counter()
+                yield sse_event(event["clause"], event="clause")
+                continue
+            result = event["result"]
+            if "error" in result:
+                yield sse_event({"error": result["error"]}, event="error")
+                return
+            yield sse_event({
+                **{k: v for k, v in result.items() if k != "clauses"},
+                "first_clause_ms": round(((first_clause or time.perf_counter()) - started) * 1000, 1),
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            }, event="done")
+    except Exception as e:
+        yield sse_event({"error": f"Failed to extract clauses: {str(e)}"}, event="error")
+    finally:
+        os.unlink(tmp_file_path)
+
+
+@app.post("/extract-clauses/stream")
+async def extract_clauses_from_pdf_stream(file: UploadFile = None):
+    """Server-sent-events variant of /extract-clauses."""
+    if file is None:
+        return sse_response(stream_error("No file uploaded."))
+    file_bytes = await file.read()
+    return sse_response(stream_clause_events(get_clause_extractor(), file_bytes))
+
 # -------------------------------
 # /extract-clauses-from-text: Extract clauses from text
 # -------------------------------
@@ -893,8 +1268,8 @@ async def extract_clauses_from_text(document_text: str = Form(...)):
 
     try:
         # Initialize clause extractor
-        extractor = ClauseExtractor(api_key=GEMINI_API_KEY)
-        result = extractor.extract_clauses_from_text(document_text)
+        extractor = get_clause_extractor()
+        result = await extractor.aextract_clauses_from_text(document_text)
         
         return result
     except Exception as e:
@@ -903,6 +1278,16 @@ async def extract_clauses_from_text(document_text: str = Form(...)):
 # -------------------------------
 # /compare-clauses: Compare clauses between two PDFs
 # -------------------------------
+async def extract_clauses_from_upload(extractor: ClauseExtractor, file_bytes: bytes):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(file_bytes)
+        tmp_file_path = tmp_file.name
+    try:
+        return await extractor.aextract_clauses_from_pdf(tmp_file_path)
+    finally:
+        os.unlink(tmp_file_path)
+
+
 @app.post("/compare-clauses")
 async def compare_clauses(file1: UploadFile = None, file2: UploadFile = None):
     """Compare clauses between two uploaded PDF files"""
@@ -911,34 +1296,22 @@ async def compare_clauses(file1: UploadFile = None, file2: UploadFile = None):
 
     try:
         # Initialize clause extractor
-        extractor = ClauseExtractor(api_key=GEMINI_API_KEY)
+        extractor = get_clause_extractor()
         
-        # Process first file
-        file1_bytes = await file1.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file1:
-            tmp_file1.write(file1_bytes)
-            tmp_file1_path = tmp_file1.name
-        
-        result1 = extractor.extract_clauses_from_pdf(tmp_file1_path)
-        os.unlink(tmp_file1_path)
+        # Both documents are extracted concurrently
+        file1_bytes, file2_bytes = await file1.read(), await file2.read()
+        result1, result2 = await asyncio.gather(
+            extract_clauses_from_upload(extractor, file1_bytes),
+            extract_clauses_from_upload(extractor, file2_bytes),
+        )
         
         if "error" in result1:
             return result1
-        
-        # Process second file
-        file2_bytes = await file2.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file2:
-            tmp_file2.write(file2_bytes)
-            tmp_file2_path = tmp_file2.name
-        
-        result2 = extractor.extract_clauses_from_pdf(tmp_file2_path)
-        os.unlink(tmp_file2_path)
-        
         if "error" in result2:
             return result2
         
         # Compare clauses
-        comparison = extractor.compare_clauses(
+        comparison = await extractor.acompare_clauses(
             result1.get("clauses", []),
             result2.get("clauses", [])
         )
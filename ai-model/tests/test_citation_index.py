@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import pytest
+from utils.citation_index import CITATION_SOURCES, HEADING_PATTERN, CitationIndex
+
+
+@pytest.mark.parametrize("query, keys", [
+    ("punishment under section 302 IPC", ["ipc:section:302"]),
+    ("section 302 of the Indian Penal Code", ["ipc:section:302"]),
+    ("section 420", ["ipc:section:420"]),
+    ("chapter 16 of IPC", ["ipc:chapter:XVI"]),
+    ("explain Article 21", ["constitution:article:21"]),
+    ("Part III of the Constitution", ["constitution:part:III"]),
+    ("section 302 IPC and article 21", ["constitution:article:21", "ipc:section:302"]),
+])
+def test_parse_query_cites_ipc_and_constitution(query, keys):
+    assert CitationIndex.parse_query(query) == keys
+
+
+@pytest.mark.parametrize("query", [
+    "What does Section 138 of the Negotiable Instruments Act say",
+    "explain section 9 CPC",
+    "section 154 CrPC",
+    "part 3 of the agreement",
+    "chapter 2 of the contract",
+    "article 5 of the lease deed",
+])
+def test_parse_query_ignores_other_laws_and_documents(query):
+    assert CitationIndex.parse_query(query) == []
+
+
+STORES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hf_vectorstores")
+
+
+class StoreCorpus:
+    """The part of CorpusIndex that CitationIndex.build reads, over the shipped pickled stores."""
+
+    def __init__(self, names):
+        from langchain_community.vectorstores import FAISS
+        self.source_names, self.documents, source_ids = list(names), [], []
+        for source_id, name in enumerate(self.source_names):
+            vs = FAISS.load_local(os.path.join(STORES_DIR, name), None, allow_dangerous_deserialization=True)
+            self.documents += [vs.docstore.search(vs.index_to_docstore_id[i]) for i in range(vs.index.ntotal)]
+            source_ids += [source_id] * vs.index.ntotal
+        self.source_ids = np.array(source_ids, dtype=np.int16)
+
+    def get_document(self, global_id):
+        return self.documents[global_id]
+
+
+@pytest.fixture(scope="module")
+def shipped_index():
+    if not all(os.path.isdir(os.path.join(STORES_DIR, name)) for name in CITATION_SOURCES):
+        pytest.skip("shipped vectorstores not available")
+    return CitationIndex().build(StoreCorpus(CITATION_SOURCES)).table
+
+
+@pytest.mark.parametrize("text, number, title", [
+    ("liable to fine.] \n1[376B. Sexual intercourse by husband .—Whoever", "376B", "Sexual intercourse by husband"),
+    ("Special Provisions)2311[370. Temporary provisions.—(1) Notwithstanding", "370", "Temporary provisions"),
+    ("PART ITHE UNION AND ITS TERRITORY1. Name and territory of the Union.—(1) India", "1", "Name and territory of the Union"),
+])
+def test_heading_pattern_reads_amended_and_run_on_headings(text, number, title):
+    match = HEADING_PATTERN.search(text)
+    assert (match.group(1), match.group(2).strip()) == (number, title)
+
+
+def test_heading_title_stops_at_next_heading():
+    # Table-of-contents entries have no dash of their own; the title must not swallow the following entries
+    text = "ARTICLES 1. Name and territory of the Union.  2. Admission of new States. 2[2A. Sikkim.—"
+    assert [match.group(1) for match in HEADING_PATTERN.finditer(text)] == ["2A"]
+
+
+def test_shipped_stores_index_amended_provisions(shipped_index):
+    assert shipped_index["ipc:section:376B"]["title"].startswith("Sexual intercourse by husband")
+    assert shipped_index["constitution:article:370"]["title"].startswith("Temporary provisions")
+    assert shipped_index["constitution:article:1"]["title"] == "Name and territory of the Union"
+
+
+def test_shipped_stores_stop_articles_at_schedules(shipped_index):
+    # Sixth Schedule paragraph "21. Autonomous districts ..." (page 310) is not Article 21
+    assert shipped_index["constitution:article:21"]["pages"] == [41, 41]
+    assert shipped_index["constitution:article:21"]["title"] == "Protection of life and personal liberty"
+    assert max(shipped_index["constitution:part:III"]["pages"]) < 283
@@ -0,0 +1,44 @@
+import re
+import pytest
+
+pytest.importorskip("langchain.text_splitter")
+from utils.clause_extractor import ClauseExtractor
+
+# The regex parser _extract_clause_fields replaced, kept as the reference its output must match
+LEGACY_PATTERNS = {
+    'type': r'Type:\s*([^\n]+)',
+    'text': r'Text:\s*([^\n]+(?:\n(?!(?:Key Points|Risk Level|Analysis):)[^\n]*)*)',
+    'key_points': r'Key Points:\s*([^\n]+(?:\n(?!(?:Risk Level|Analysis):)[^\n]*)*)',
+    'risk_level': r'Risk Level:\s*([^\n]+)',
+    'analysis': r'Analysis:\s*([^\n]+(?:\n(?!(?:Type|Text|Key Points|Risk Level):)[^\n]*)*)'
+}
+
+
+def legacy_extract_clause_fields(clause_block):
+    clause = {}
+    for field, pattern in LEGACY_PATTERNS.items():
+        match = re.search(pattern, clause_block, re.IGNORECASE | re.DOTALL)
+        if match:
+            clause[field] = re.sub(r'^[\*\-\•]\s*', '', match.group(1).strip(), flags=re.MULTILINE)
+        else:
+            clause[field] = 'Not specified'
+    return clause if any(v != 'Not specified' for v in clause.values()) else None
+
+
+@pytest.mark.parametrize("block", [
+    "Type: Indemnification\nText: The Supplier shall indemnify the Buyer.\nKey Points: - covers third-party claims\n"
+    "- uncapped\nRisk Level: High\nAnalysis: Broad indemnity.\nConsider a cap.",
+    "Type:\nIndemnification\nText: The Supplier shall indemnify the Buyer.\nRisk Level:\nHigh\nAnalysis: Broad.",
+    "Type:\n\nTermination\nRisk Level:   \n  Medium\nText:\nEither party may terminate on notice.",
+    "Clause Type: Confidentiality\nText: Keep it secret.\nRisk Level: Low",
+    "Text: Payment within 30 days.\nAnalysis: Standard.",
+    "Type: Governing Law",
+    "No labels in this block at all",
+])
+def test_field_parser_matches_legacy_regex_parser(block):
+    assert ClauseExtractor._extract_clause_fields(None, block) == legacy_extract_clause_fields(block)
+
+
+def test_label_then_newline_takes_next_line():
+    clause = ClauseExtractor._extract_clause_fields(None, "Type:\nIndemnification\nRisk Level:\nHigh")
+    assert (clause["type"], clause["risk_level"]) == ("Indemnification", "High")
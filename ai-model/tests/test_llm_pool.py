@@ -0,0 +1,108 @@
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
+import pytest
+from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import LLMClientPool
+
+MODEL = "models/gemini-2.5-pro"
+RESPONSE = {
+    "candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}, "finishReason": "STOP", "index": 0}],
+    "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients may keep the connection open between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.delay)
+        body = json.dumps(RESPONSE).encode("utf-8")
+        with self.server.lock:
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_gemini():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGeminiHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_pool(server, **kwargs):
+    return LLMClientPool(base_url=base_url(server), **kwargs)
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_sequential_calls_reuse_one_connection(fake_gemini):
+    pool = make_pool(fake_gemini, pool_size=1)
+    for _ in range(10):
+        assert pool.get(MODEL, "test-key", temperature=0.2).invoke("hello").content == "ok"
+
+    assert fake_gemini.requests == 10
+    assert fake_gemini.connections == 1
+    assert pool.stats()["created"] == 1
+
+
+def test_fresh_unpooled_clients_open_a_connection_per_call(fake_gemini):
+    # What the pool saves: a client built per request cannot reuse the previous request's connection
+    for _ in range(5):
+        llm = ChatGoogleGenerativeAI(model=MODEL, google_api_key="test-key", base_url=base_url(fake_gemini))
+        assert llm.invoke("hello").content == "ok"
+
+    assert fake_gemini.requests == 5
+    assert fake_gemini.connections == 5
+
+
+def test_concurrent_calls_are_bounded_by_the_connection_pool(fake_gemini):
+    pool = make_pool(fake_gemini, pool_size=1, max_connections=2)
+
+    async def run():
+        llm = pool.get(MODEL, "test-key", temperature=0.2)
+        for _ in range(3):
+            await asyncio.gather(*(llm.ainvoke("hello") for _ in range(8)))
+
+    asyncio.run(run())
+    assert fake_gemini.requests == 24
+    assert fake_gemini.connections <= 2
+
+
+def test_stalled_call_times_out(fake_gemini):
+    fake_gemini.delay = 5
+    pool = make_pool(fake_gemini, pool_size=1, timeout_seconds=0.5)
+    llm = pool.get(MODEL, "test-key", temperature=0.2, max_retries=0)
+
+    async def run():
+        started = time.monotonic()
+        with pytest.raises(Exception):
+            await llm.ainvoke("hello")
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 4
@@ -0,0 +1,52 @@
+import re
+import random
+import pytest
+
+pytest.importorskip("fastapi")
+from utils.streaming import MarkdownStreamCleaner
+
+
+def legacy_clean_ai_response(response):
+    """The regex passes clean_ai_response ran over a whole answer before streaming was added."""
+    cleaned = response.strip()
+    cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
+    cleaned = re.sub(r'[ \t]+$', '', cleaned, flags=re.MULTILINE)
+    cleaned = re.sub(r'(\d+)\.\s*###\s*', r'\n\n\1. ### ', cleaned)
+    cleaned = re.sub(r'(?<!\n)\s*(### )', r'\n\n\1', cleaned)
+    cleaned = re.sub(r'^[*+•]\s+', '- ', cleaned, flags=re.MULTILINE)
+    cleaned = re.sub(r'(\d+)\.(?=[^\s])', r'\1. ', cleaned)
+    cleaned = re.sub(r'(###\s+){2,}', r'### ', cleaned)
+    return cleaned
+
+
+ANSWERS = [
+    "Under Section 302 IPC, murder is punishable with death or life imprisonment.  \n\n\n\nIt also attracts a fine.",
+    "Key points:\n* Notice period of 30 days\n+ Termination for cause\n• Governing law is India\n\n1.Payment\n2.Delivery",
+    "Intro text.\n### Legal Position\nThe court held that...   \n\n### Defence Strategy\n- Challenge the evidence\n",
+    "### Summary\nThe clause is one-sided.\n\n### Risks\n1. Unlimited liability\n2. No cap on damages",
+    "\n\n  Answer with leading blank lines.\n\nSecond paragraph.\n\n\n",
+]
+
+
+def stream(text, rng):
+    """Feed text in random chunks (including empty and single-character ones); returns everything emitted."""
+    cleaner, out, position = MarkdownStreamCleaner(), [], 0
+    while position < len(text):
+        size = rng.choice([0, 1, 1, 2, 3, 5, 8, 13, 40])
+        out.append(cleaner.feed(text[position:position + size]))
+        position += size
+    out.append(cleaner.finish())
+    return "".join(out)
+
+
+@pytest.mark.parametrize("answer", ANSWERS)
+def test_streamed_cleaning_matches_batch_cleaner_under_any_chunking(answer):
+    expected = legacy_clean_ai_response(answer)
+    # Intentional difference: the old passes put a blank line before a heading even at the very start
+    if expected.startswith("\n\n### "):
+        expected = expected[2:]
+
+    rng = random.Random(answer)
+    for _ in range(200):
+        assert stream(answer, rng) == expected
+    assert MarkdownStreamCleaner.clean(answer) == expected
@@ -0,0 +1,120 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+import numpy as np
+import faiss
+from utils.citation_index import CitationIndex
+
+# Cached answers are a str (/chat) or a response dict (/ask-existing)
+Answer = Union[str, dict]
+# Section numbers, article numbers, years, amounts: queries differing in any of them never share an answer
+NUMBER_TOKEN = re.compile(r"\b\d+[a-z]{0,2}\b", re.IGNORECASE)
+# Neighbours examined per lookup, so expired entries do not hide valid ones behind them
+LOOKUP_CANDIDATES = 8
+
+
+class SemanticAnswerCache:
+    """Caches final LLM answers and serves them for semantically near-identical questions."""
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # namespace -> cosine-similarity index over cached query vectors
+        self._indexes: Dict[str, faiss.IndexIDMap2] = {}
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def namespace(endpoint: str, prompt_version: str, sources: Optional[List[str]] = None,
+                  query: Optional[str] = None) -> str:
+        """
+        Cache partition for a query. The provisions and numbers it cites are part of the key, since
+        "section 302 IPC" and "section 304 IPC" embed almost identically but need different answers.
+        """
+        source_key = ",".join(sorted(sources)) if sources else "*"
+        citation_key = "*"
+        if query:
+            cited = set(CitationIndex.parse_query(query)) | {n.upper() for n in NUMBER_TOKEN.findall(query)}
+            citation_key = ",".join(sorted(cited)) or "*"
+        return f"{endpoint}|{prompt_version}|{source_key}|{citation_key}"
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray([vector], dtype=np.float32)
+        faiss.normalize_L2(vec)
+        return vec
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            index = self._indexes[entry["namespace"]]
+            index.remove_ids(np.asarray([entry_id], dtype=np.int64))
+            # Citation-specific namespaces are small; drop them once empty
+            if index.ntotal == 0:
+                del self._indexes[entry["namespace"]]
+
+    def lookup(self, namespace: str, query_vector) -> Optional[Answer]:
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None or index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = index.search(self._normalize(query_vector), min(LOOKUP_CANDIDATES, index.ntotal))
+            now = time.time()
+            for entry_id, score in zip(ids[0], scores[0]):
+                entry_id, score = int(entry_id), float(score)
+                if entry_id < 0 or score < self.threshold:
+                    break
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    continue
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                self.latency_saved += entry["latency"]
+                return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, namespace: str, query_vector, answer: Answer, latency: float):
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                dim = len(query_vector)
+                index = self._indexes[namespace] = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(self._normalize(query_vector), np.asarray([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "namespace": namespace,
+                "answer": answer,
+                "latency": latency,
+                "created_at": time.time(),
+            }
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
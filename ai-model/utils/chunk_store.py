@@ -0,0 +1,209 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: aliases are only coordinated between threads of one process
+    fcntl = None
+
+ALIASES_FILE = "aliases.json"
+
+
+def chunk_key(text: str, model_id: str) -> str:
+    return hashlib.sha256(f"{model_id}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(texts: Iterable[str]) -> str:
+    """Hash of a document's chunk texts in order, ignoring whitespace-only differences."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(re.sub(r"\s+", " ", text).strip().encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class ChunkEmbeddingStore:
+    """Persistent content-addressed store of chunk embeddings keyed by hash(model id + chunk text)."""
+
+    def __init__(self, path: str, model_id: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.model_id = model_id
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, vector BLOB)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, texts: List[str]) -> Dict[str, List[float]]:
+        keys = list({chunk_key(text, self.model_id) for text in texts})
+        found = {}
+        with self._lock:
+            # SQLite limits bound parameters per statement, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM chunks WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update({key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows})
+        return found
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        rows = [
+            (chunk_key(text, self.model_id), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO chunks (key, vector) VALUES (?, ?)", rows)
+            self._db.commit()
+
+    def embed_documents(self, texts: List[str], embed_fn) -> List[List[float]]:
+        """Embed only chunks not seen before; the rest come from the store."""
+        found = self.get_many(texts)
+        keys = [chunk_key(text, self.model_id) for text in texts]
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = embed_fn(missing)
+            self.put_many(missing, vectors)
+            found.update({chunk_key(text, self.model_id): vector for text, vector in zip(missing, vectors)})
+        return [found[key] for key in keys]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class StoreAliases:
+    """
+    Maps file ids and content fingerprints onto the one vectorstore directory holding that content.
+    The JSON file is shared by every worker process: reads pick up changes written elsewhere, and
+    writes re-read and update it under a file lock so workers never drop each other's aliases.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"files": {}, "content": {}, "stores": {}}
+        self._loaded_stamp = None
+        self._reload()
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        """Re-read the file if another process (or instance) changed it since the last read."""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._loaded_stamp:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        data.setdefault("files", {})
+        data.setdefault("content", {})
+        data.setdefault("stores", {})
+        self.data, self._loaded_stamp = data, stamp
+
+    @contextmanager
+    def _update(self):
+        """Read-modify-write of the alias file, exclusive across threads and processes."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._reload()
+                    yield self.data
+                    self._save()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._loaded_stamp = self._stamp()
+
+    def resolve(self, name: str) -> str:
+        self._reload()
+        return self.data["files"].get(name, name)
+
+    def find_content(self, fingerprint: str) -> Optional[str]:
+        self._reload()
+        return self.data["content"].get(fingerprint)
+
+    def fingerprint_of(self, store_name: str) -> Optional[str]:
+        self._reload()
+        return self.data["stores"].get(store_name)
+
+    def register_content(self, fingerprint: str, store_name: str):
+        with self._update() as data:
+            data["stores"][store_name] = fingerprint
+            data["content"].setdefault(fingerprint, store_name)
+
+    def link(self, file_id: str, store_name: str):
+        if file_id == store_name or self.resolve(file_id) == store_name:
+            return
+        with self._update() as data:
+            data["files"][file_id] = store_name
+
+
+def dedupe_stores(vectorstore_dir: str, remove_duplicates: bool = False):
+    """Alias hf_vectorstores directories that hold identical content to a single canonical store."""
+    import shutil
+    from utils.vector_index import load_vectorstore, store_document, store_size
+
+    aliases = StoreAliases(os.path.join(vectorstore_dir, ALIASES_FILE))
+    names = sorted(
+        # Dot-prefixed directories are in-progress or abandoned atomic writes
+        (n for n in os.listdir(vectorstore_dir)
+         if not n.startswith(".") and os.path.isdir(os.path.join(vectorstore_dir, n))),
+        # Prefer human-named predefined stores over md5 upload ids as the canonical copy
+        key=lambda n: (bool(re.fullmatch(r"[0-9a-f]{32}", n)), n),
+    )
+    for name in names:
+        vs = load_vectorstore(os.path.join(vectorstore_dir, name), None)
+        fingerprint = content_fingerprint(store_document(vs, i).page_content for i in range(store_size(vs)))
+        canonical = aliases.find_content(fingerprint)
+        if canonical is None or canonical == name:
+            aliases.register_content(fingerprint, name)
+            continue
+
+        aliases.link(name, canonical)
+        print(f"🔗 {name} duplicates {canonical}")
+        if remove_duplicates:
+            shutil.rmtree(os.path.join(vectorstore_dir, name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alias duplicate vectorstores to one canonical directory.")
+    parser.add_argument("command", choices=["dedupe"])
+    parser.add_argument("vectorstore_dir", nargs="?", default="hf_vectorstores")
+    parser.add_argument("--remove-duplicates", action="store_true", help="Delete aliased duplicate directories")
+    args = parser.parse_args(argv)
+    dedupe_stores(args.vectorstore_dir, args.remove_duplicates)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Predefined stores whose provisions can be cited directly: store name -> (act key, provision unit, division unit)
+CITATION_SOURCES = {
+    "IPC": ("ipc", "section", "chapter"),
+    "Constitution of India": ("constitution", "article", "part"),
+}
+MAX_CHUNKS_PER_PROVISION = 4
+# Bump when heading parsing changes so saved tables are rebuilt
+INDEX_VERSION = 2
+
+# Body headings look like "302. Punishment for murder .—Whoever ..." (table-of-contents lines have no dash);
+# amended provisions carry a footnote marker, "1[376B. ..." or "2311[370. ..." after a running page number, and
+# the first heading of a part runs into its all-caps title ("PART ITHE UNION AND ITS TERRITORY1. Name ...")
+NEXT_HEADING = r"(?<!\w)\d*\[?\d{1,3}[A-Z]{0,2}\.\s"
+HEADING_PATTERN = re.compile(
+    r"(?:^|(?<=[\s.\]\)A-Z]))(?:\d*\[)?(\d{1,3}[A-Z]{0,2})\.\s*"
+    r"([A-Z](?:(?!" + NEXT_HEADING + r"|\.[A-Z])[^—–\n]){2,160}?)\s*\.?\s*(?:—|–|--)"
+)
+# A heading's dash can open the next chunk: "... State of Jammu and Kashmir" | ".—(1) Notwithstanding ..."
+CONTINUED_DASH = re.compile(r"^\s*\.?\s*(?:—|–|--)")
+# Schedules ("SIXTH SCHEDULE [Articles 244(2) and 275(1)]") restart their own paragraph numbering
+SCHEDULE_PATTERN = re.compile(r"\bSCHEDULE\s*[\[(]\s*(?:Articles?|See)\b")
+DIVISION_PATTERN = re.compile(r"\b(CHAPTER|PART)\s+([IVXLC]+[A-Z]?)\b")
+
+SECTION_QUERY = re.compile(r"\b(?:section|sec\.?|s\.)\s*(\d{1,3}[a-z]{0,2})\b", re.IGNORECASE)
+IPC_SUFFIX_QUERY = re.compile(r"\b(\d{1,3}[a-z]{0,2})\s*(?:of\s+(?:the\s+)?)?(?:ipc|indian penal code|penal code)\b", re.IGNORECASE)
+ARTICLE_QUERY = re.compile(r"\b(?:article|art\.?)\s*(\d{1,3}[a-z]{0,2})\b", re.IGNORECASE)
+DIVISION_QUERY = re.compile(r"\b(chapter|part)\s+([ivxlc]+[a-z]?|\d{1,2})\b", re.IGNORECASE)
+
+# Which law a query is about: bare "section N" means IPC and bare "article N" the Constitution only when no
+# other Act or document is named ("section 138 of the NI Act", "part 3 of the agreement")
+IPC_NAMED = re.compile(r"\b(?:ipc|i\.p\.c\b\.?|indian penal code|penal code)", re.IGNORECASE)
+CONSTITUTION_NAMED = re.compile(r"\bconstitution\b", re.IGNORECASE)
+OTHER_LAW_NAMED = re.compile(
+    r"\b(?:act|code|crpc|cr\.?\s?p\.?\s?c|cpc|c\.p\.c|bns|bnss|bsa|rules?|regulations?|ordinance|bill|"
+    r"agreement|contract|deed|lease|policy|document|memorandum|articles of association)\b",
+    re.IGNORECASE,
+)
+
+ROMAN = [(40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+
+
+def to_roman(number: int) -> str:
+    result = ""
+    for value, numeral in ROMAN:
+        while number >= value:
+            result += numeral
+            number -= value
+    return result
+
+
+class CitationIndex:
+    """Lookup table from provision identifiers (e.g. "ipc:section:302") to corpus chunk ids and pages."""
+
+    def __init__(self):
+        self.table: Dict[str, dict] = {}
+        self.fingerprint: Optional[str] = None
+
+    @staticmethod
+    def corpus_fingerprint(corpus) -> str:
+        counts = [int(np.count_nonzero(corpus.source_ids == i)) for i in range(len(corpus.source_names))]
+        return json.dumps([INDEX_VERSION, list(zip(corpus.source_names, counts))])
+
+    def _add(self, key: str, title: str, global_id: int, page):
+        entry = self.table.setdefault(key, {"title": title, "chunks": [], "pages": []})
+        if len(entry["chunks"]) < MAX_CHUNKS_PER_PROVISION and global_id not in entry["chunks"]:
+            entry["chunks"].append(global_id)
+            if page is not None:
+                entry["pages"] = [min(entry["pages"] + [page]), max(entry["pages"] + [page])]
+
+    def build(self, corpus) -> "CitationIndex":
+        """Scan the cited acts in chunk order and record where each provision's body text lives."""
+        self.table = {}
+        for source_id, name in enumerate(corpus.source_names):
+            if name not in CITATION_SOURCES:
+                continue
+            act, unit, division_unit = CITATION_SOURCES[name]
+            open_provision = None
+            global_ids = np.flatnonzero(corpus.source_ids == source_id)
+            following = corpus.get_document(int(global_ids[0])) if len(global_ids) else None
+
+            for position, global_id in enumerate(global_ids):
+                doc = following
+                following = corpus.get_document(int(global_ids[position + 1])) if position + 1 < len(global_ids) else None
+                page = doc.metadata.get("page")
+                text = doc.page_content
+                if following is not None and CONTINUED_DASH.match(following.page_content):
+                    text += "—"
+
+                # A provision's text continues into following chunks until the next heading
+                if open_provision:
+                    self._add(open_provision, self.table[open_provision]["title"], int(global_id), page)
+
+                schedule = SCHEDULE_PATTERN.search(text)
+                if schedule:
+                    text = text[:schedule.start()]
+
+                for match in DIVISION_PATTERN.finditer(text):
+                    kind = "chapter" if match.group(1) == "CHAPTER" else "part"
+                    if kind == division_unit:
+                        self._add(f"{act}:{kind}:{match.group(2)}", match.group(0), int(global_id), page)
+
+                for match in HEADING_PATTERN.finditer(text):
+                    open_provision = f"{act}:{unit}:{match.group(1).upper()}"
+                    self._add(open_provision, match.group(2).strip(), int(global_id), page)
+
+                # Schedule paragraphs ("21. Autonomous districts ...") are not articles; nothing after is indexed
+                if schedule:
+                    break
+
+        self.fingerprint = self.corpus_fingerprint(corpus)
+        print(f"✅ Citation index built: {len(self.table)} provisions.")
+        return self
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "table": self.table}, f)
+
+    def load_or_build(self, path: str, corpus) -> "CitationIndex":
+        fingerprint = self.corpus_fingerprint(corpus)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                self.table, self.fingerprint = data["table"], fingerprint
+                print(f"✅ Loaded citation index: {len(self.table)} provisions.")
+                return self
+        self.build(corpus)
+        self.save(path)
+        return self
+
+    @staticmethod
+    def parse_query(query: str) -> List[str]:
+        """Provision keys cited in a query, e.g. "explain Article 370" -> ["constitution:article:370"]."""
+        named = [m.span() for m in IPC_NAMED.finditer(query)] + [m.span() for m in CONSTITUTION_NAMED.finditer(query)]
+        # "Code" inside "Indian Penal Code" is not another law
+        other_law = any(
+            not any(start <= m.start() < end for start, end in named) for m in OTHER_LAW_NAMED.finditer(query)
+        )
+        ipc = bool(IPC_NAMED.search(query)) or not other_law
+        constitution = bool(CONSTITUTION_NAMED.search(query)) or not other_law
+
+        keys = []
+        divisions = list(DIVISION_QUERY.finditer(query))
+        if constitution:
+            for match in ARTICLE_QUERY.finditer(query):
+                keys.append(f"constitution:article:{match.group(1).upper()}")
+        if ipc:
+            for match in SECTION_QUERY.finditer(query):
+                keys.append(f"ipc:section:{match.group(1).upper()}")
+        for match in IPC_SUFFIX_QUERY.finditer(query):
+            # "chapter 16 of IPC" names a chapter, not section 16
+            if not any(d.start() <= match.start(1) < d.end() for d in divisions):
+                keys.append(f"ipc:section:{match.group(1).upper()}")
+        for match in divisions:
+            number = match.group(2)
+            numeral = to_roman(int(number)) if number.isdigit() else number.upper()
+            if match.group(1).lower() == "chapter":
+                if ipc:
+                    keys.append(f"ipc:chapter:{numeral}")
+            elif constitution:
+                keys.append(f"constitution:part:{numeral}")
+        return list(dict.fromkeys(keys))
+
+    def lookup(self, query: str, allowed_sources: Optional[List[str]] = None) -> List[Tuple[str, dict]]:
+        allowed_acts = None
+        if allowed_sources:
+            allowed_acts = {CITATION_SOURCES[s][0] for s in allowed_sources if s in CITATION_SOURCES}
+        hits = []
+        for key in self.parse_query(query):
+            if key in self.table and (allowed_acts is None or key.split(":")[0] in allowed_acts):
+                hits.append((key, self.table[key]))
+        return hits
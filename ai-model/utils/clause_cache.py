@@ -0,0 +1,68 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+
+def normalize_document_text(text: str) -> str:
+    """Whitespace-insensitive form of a document, so re-extracted or re-pasted copies share a cache entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class ClauseResultCache:
+    """Persistent ClauseExtractor results keyed by document text hash, model and prompt version, LRU-bounded."""
+
+    def __init__(self, path: str, max_entries: int = 500):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, "
+                         "result TEXT, created REAL, last_used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(document_text: str, model: str, prompt_version: str) -> str:
+        text_hash = hashlib.sha256(normalize_document_text(document_text).encode("utf-8")).hexdigest()
+        return f"{model}|{prompt_version}|{text_hash}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]):
+        model, prompt_version, _ = key.split("|", 2)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results (key, model, prompt_version, result, created, last_used) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", (key, model, prompt_version, json.dumps(result), now, now))
+            # Least recently used entries go first once the cache is over size
+            self._db.execute("DELETE FROM results WHERE key NOT IN "
+                             "(SELECT key FROM results ORDER BY last_used DESC LIMIT ?)", (self.max_entries,))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
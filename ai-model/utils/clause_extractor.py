@@ -1,22 +1,181 @@
 import os
 import re
-from typing import Dict, List, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
+import json
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
+from utils.document_cache import ParsedDocumentCache, extract_pdf
+from utils.clause_cache import ClauseResultCache
+from utils.concurrency import ainvoke_llm, embed_stage, llm_slot, parse_stage
+from utils.llm_pool import llm_clients
+
+# Documents longer than this are split into segments extracted in parallel (0 = always one prompt)
+SEGMENT_CHARS = int(os.getenv("CLAUSE_SEGMENT_CHARS", "24000"))
+# Segment extractions in flight per document
+SEGMENT_CONCURRENCY = int(os.getenv("CLAUSE_SEGMENT_CONCURRENCY", "4"))
+# Extra attempts for a failed segment before it is reported in failed_segments
+SEGMENT_RETRIES = int(os.getenv("CLAUSE_SEGMENT_RETRIES", "1"))
+
+# Send only paragraphs that mention a clause keyword (plus neighbours) instead of the whole document
+PREFILTER = os.getenv("CLAUSE_PREFILTER", "1") == "1"
+# Paragraphs kept on each side of a keyword match
+PREFILTER_CONTEXT = int(os.getenv("CLAUSE_PREFILTER_CONTEXT", "1"))
+# Longer paragraphs (e.g. pages without blank lines) are cut into line groups of about this size
+PARAGRAPH_CHARS = 1500
+PREFILTER_TAG = "[Suspected clause types:"
+
+# Cosine similarity above which clauses of the same type are aligned as the same clause in /compare-clauses
+MATCH_THRESHOLD = float(os.getenv("CLAUSE_MATCH_THRESHOLD", "0.75"))
+# Clauses whose types differ are only aligned when nearly identical in wording
+CROSS_TYPE_THRESHOLD = float(os.getenv("CLAUSE_CROSS_TYPE_THRESHOLD", "0.9"))
+
+# Lines that start a new section: "Section 4", "ARTICLE IV", "12.", "3.2 Payment", an all-caps heading,
+# or a pre-filtered passage
+SECTION_HEADING = re.compile(
+    r'^[ \t]*(?:\[Suspected clause types:'
+    r'|(?i:section|article|clause|schedule|annexure|appendix|part)\s+[\dIVXLC]+\b'
+    r'|\d+(?:\.\d+)*[.)]?[ \t]+\S'
+    r'|[A-Z][A-Z \t\-&,]{3,}$)',
+    re.MULTILINE,
+)
+
+
+def split_sections(text: str, max_chars: int = SEGMENT_CHARS) -> List[str]:
+    """Split a document into segments of at most max_chars, cutting only at section headings where possible."""
+    bounds = sorted({0, len(text), *(match.start() for match in SECTION_HEADING.finditer(text))})
+    sections = [text[start:end] for start, end in zip(bounds, bounds[1:]) if text[start:end].strip()]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0)
+    segments, current = [], ""
+    for section in sections:
+        if len(section) > max_chars:
+            # A single section longer than a segment falls back to paragraph/sentence boundaries
+            if current:
+                segments.append(current)
+                current = ""
+            segments.extend(splitter.split_text(section))
+        elif current and len(current) + len(section) > max_chars:
+            segments.append(current)
+            current = section
+        else:
+            current += section
+    if current.strip():
+        segments.append(current)
+    return segments
+
+
+BLANK_LINES = re.compile(r'\n[ \t]*\n')
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Paragraphs of a document, cut at blank lines and section headings; lossless ("".join gives text back)."""
+    bounds = sorted({0, len(text), *(match.end() for match in BLANK_LINES.finditer(text)),
+                     *(match.start() for match in SECTION_HEADING.finditer(text))})
+    paragraphs = []
+    for start, end in zip(bounds, bounds[1:]):
+        paragraph = text[start:end]
+        if len(paragraph) <= PARAGRAPH_CHARS:
+            paragraphs.append(paragraph)
+            continue
+        current = ""
+        for line in paragraph.splitlines(keepends=True):
+            if current and len(current) + len(line) > PARAGRAPH_CHARS:
+                paragraphs.append(current)
+                current = ""
+            current += line
+        paragraphs.append(current)
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly 4 characters per token for English legal text
+    return (len(text) + 3) // 4
+
+
+CLAUSE_START = re.compile(r'CLAUSE_START', re.IGNORECASE)
+CLAUSE_END = re.compile(r'CLAUSE_END', re.IGNORECASE)
+# "Type: ...", "Key Points: ..." etc. at the start of a line ("Clause Type:" is accepted too)
+FIELD_LABEL = re.compile(r'^\s*(?:clause\s+)?(type|text|key points|risk level|analysis)\s*:\s*(.*)$', re.IGNORECASE)
+FIELD_NAMES = {"type": "type", "text": "text", "key points": "key_points", "risk level": "risk_level",
+               "analysis": "analysis"}
+# Fields whose value is the rest of the label line only
+SINGLE_LINE_FIELDS = {"type", "risk_level"}
+
+MULTIPLE_ASTERISKS = re.compile(r'\*{2,}')
+LEADING_BULLET = re.compile(r'^\s*[\*\-\•]\s*', re.MULTILINE)
+ASTERISK_EMPHASIS = re.compile(r'\*([^\*]+)\*')
+EXTRA_NEWLINES = re.compile(r'\n{3,}')
+
+
+class ClauseStreamParser:
+    """
+    Incremental CLAUSE_START/CLAUSE_END parser: feed model output as it arrives and get each clause back
+    as soon as its CLAUSE_END is seen. Each character is searched once (plus a marker-length overlap
+    at chunk edges) and only the current block is buffered, so parsing stays linear however it is chunked.
+    """
+
+    def __init__(self, parse_block: Callable[[str], Optional[Dict[str, Any]]]):
+        self._parse_block = parse_block
+        self._buffer = ""
+        self._scan_from = 0
+        self._in_block = False
+        self.blocks = 0
+        self.clauses: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buffer += chunk
+        found = []
+        while True:
+            marker = CLAUSE_END if self._in_block else CLAUSE_START
+            match = marker.search(self._buffer, self._scan_from)
+            if match is None:
+                # A marker split across chunks can start at most len(marker) - 1 characters back
+                tail = len(marker.pattern) - 1
+                if not self._in_block:
+                    # Text outside blocks is never needed again
+                    self._buffer = self._buffer[-tail:]
+                self._scan_from = max(0, len(self._buffer) - tail)
+                return found
+
+            if self._in_block:
+                self.blocks += 1
+                clause = self._parse_block(self._buffer[:match.start()])
+                if clause:
+                    self.clauses.append(clause)
+                    found.append(clause)
+            self._buffer = self._buffer[match.end():]
+            self._scan_from = 0
+            self._in_block = not self._in_block
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """End of output; an unterminated block is dropped."""
+        self._buffer = ""
+        self._in_block = False
+        return []
+
 
 class ClauseExtractor:
     """Extracts and analyzes clauses from legal documents."""
     
-    def __init__(self, api_key: str):
+    model_name = "models/gemini-2.5-pro"
+    
+    def __init__(self, api_key: str, document_cache: Optional[ParsedDocumentCache] = None,
+                 result_cache: Optional[ClauseResultCache] = None, embeddings=None):
         if not api_key:
             raise ValueError("❌ Google Gemini API key is missing!")
         
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-2.5-pro",
-            temperature=0.2,
-            google_api_key=api_key
-        )
+        # Parsed pages shared with the other document endpoints (see utils.document_cache)
+        self.document_cache = document_cache
+        # Finished extractions by document text, model and prompt version (see utils.clause_cache)
+        self.result_cache = result_cache
+        # Sentence embeddings for aligning clauses across documents; exact matches only when None
+        self.embeddings = embeddings
+        
+        # Shared, connection-pooled client (see utils.llm_pool)
+        self.llm = llm_clients.get(self.model_name, api_key, temperature=0.2)
         
         # Common clause types in legal documents
         self.clause_types = {
@@ -31,11 +190,83 @@ class ClauseExtractor:
             "warranties": ["warranty", "guarantee", "representation", "assurance"],
             "indemnification": ["indemnify", "hold harmless", "defend", "reimburse"]
         }
+        
+        # One combined matcher for every keyword; longest first so "intellectual property" wins over "property"
+        self._keyword_types = {
+            keyword.lower(): clause_type
+            for clause_type, keywords in self.clause_types.items()
+            for keyword in keywords
+        }
+        self._keyword_pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(k) for k in sorted(self._keyword_types, key=len, reverse=True)) + r')\b',
+            re.IGNORECASE,
+        )
+        
+        # Changes to the prompt template or to how documents are cut and filtered invalidate cached results
+        self.prompt_version = hashlib.sha256(json.dumps([
+            self._extraction_prompt("{document_text}"),
+            self._extraction_prompt(PREFILTER_TAG),
+            PREFILTER, PREFILTER_CONTEXT, SEGMENT_CHARS,
+            self.clause_types,
+        ], sort_keys=True).encode("utf-8")).hexdigest()[:16]
     
-    def extract_clauses_from_text(self, document_text: str) -> Dict[str, Any]:
-        """Extract clauses from document text using AI."""
+    def prefilter(self, document_text: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Keep only paragraphs that mention a clause keyword, with PREFILTER_CONTEXT paragraphs around them,
+        each passage tagged with its suspected clause types. Returns the text to send and a token report.
+        """
+        paragraphs = split_paragraphs(document_text)
+        types = [
+            {self._keyword_types[match.group(0).lower()] for match in self._keyword_pattern.finditer(paragraph)}
+            for paragraph in paragraphs
+        ]
+        keep = [False] * len(paragraphs)
+        for i, found in enumerate(types):
+            if found:
+                for j in range(max(0, i - PREFILTER_CONTEXT), min(len(paragraphs), i + PREFILTER_CONTEXT + 1)):
+                    keep[j] = True
+        
+        # Runs of kept paragraphs become one passage
+        passages, current, current_types = [], [], set()
+        for paragraph, found, kept in zip(paragraphs, types, keep):
+            if kept:
+                current.append(paragraph)
+                current_types |= found
+            elif current:
+                passages.append((current, current_types))
+                current, current_types = [], set()
+        if current:
+            passages.append((current, current_types))
+        
+        original_tokens = estimate_tokens(document_text)
+        if not passages:
+            # No keyword anywhere: not worth guessing, send the document as is
+            return document_text, {"original_tokens": original_tokens, "sent_tokens": original_tokens,
+                                   "tokens_saved": 0, "passages": 0}
         
-        prompt = f"""
+        filtered = "\n\n".join(
+            f"{PREFILTER_TAG} {', '.join(sorted(found))}]\n" + "".join(passage).strip()
+            for passage, found in passages
+        )
+        sent_tokens = estimate_tokens(filtered)
+        if sent_tokens >= original_tokens:
+            # Nearly everything matched; the tags would only add tokens
+            return document_text, {"original_tokens": original_tokens, "sent_tokens": original_tokens,
+                                   "tokens_saved": 0, "passages": len(passages)}
+        return filtered, {
+            "original_tokens": original_tokens,
+            "sent_tokens": sent_tokens,
+            "tokens_saved": max(0, original_tokens - sent_tokens),
+            "passages": len(passages),
+            "suspected_types": sorted(set().union(*(found for _, found in passages))),
+        }
+    
+    def _extraction_prompt(self, document_text: str) -> str:
+        hint = ""
+        if PREFILTER_TAG in document_text:
+            hint = (f"The document was pre-filtered to candidate passages. Each passage starts with a {PREFILTER_TAG} ...] "
+                    "line: treat it as a hint, not as document text, and report clauses of any type.")
+        return f"""
         You are a legal document analysis expert. Analyze the following legal document and extract key clauses.
         
         For each clause found, provide the information in this EXACT format:
@@ -48,6 +279,7 @@ class ClauseExtractor:
         Analysis: [Brief analysis in plain text, no formatting symbols]
         CLAUSE_END
         
+        {hint}
         Document Text:
         {document_text}
         
@@ -57,33 +289,159 @@ class ClauseExtractor:
         - Use simple sentences and avoid excessive formatting
         - Focus on the most important and legally significant clauses
         """
+    
+    def _structure_response(self, response) -> Dict[str, Any]:
+        analysis = response.content if hasattr(response, 'content') else str(response)
+        
+        # Parse the AI response and structure it
+        structured_clauses = self._parse_ai_response(analysis)
+        
+        return self._structure_clauses(structured_clauses)
+    
+    def _structure_clauses(self, clauses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "clauses": clauses,
+            "summary": self._generate_clause_summary(clauses),
+            "total_clauses": len(clauses)
+        }
+    
+    def _segments(self, document_text: str) -> List[str]:
+        if SEGMENT_CHARS <= 0 or len(document_text) <= SEGMENT_CHARS:
+            return [document_text]
+        return split_sections(document_text, SEGMENT_CHARS)
+    
+    def _extract_segment(self, segment: str):
+        """Clauses of one segment, or the last exception once retries are exhausted."""
+        for attempt in range(SEGMENT_RETRIES + 1):
+            try:
+                response = self.llm.invoke(self._extraction_prompt(segment))
+                return self._parse_ai_response(response.content if hasattr(response, 'content') else str(response))
+            except Exception as e:
+                print(f"⚠️ Segment extraction failed (attempt {attempt + 1}): {e}")
+                error = e
+        return error
+    
+    async def _aextract_segment(self, segment: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            for attempt in range(SEGMENT_RETRIES + 1):
+                try:
+                    response = await ainvoke_llm(self.llm, self._extraction_prompt(segment))
+                    return self._parse_ai_response(response.content if hasattr(response, 'content') else str(response))
+                except Exception as e:
+                    print(f"⚠️ Segment extraction failed (attempt {attempt + 1}): {e}")
+                    error = e
+        return error
+    
+    def _merge_clauses(self, results: List[Any]) -> Dict[str, Any]:
+        """Reduce step: concatenate per-segment clauses in document order, dropping duplicates."""
+        errors = [result for result in results if isinstance(result, Exception)]
+        if len(errors) == len(results):
+            return {"error": f"Failed to extract clauses: {str(errors[0])}"}
+        
+        clauses, seen = [], set()
+        for result in results:
+            if isinstance(result, Exception):
+                continue
+            for clause in result:
+                # Same type and same wording (ignoring case, spacing and punctuation) is one clause
+                key = self._normalize_clause(clause)
+                if key in seen:
+                    continue
+                seen.add(key)
+                clauses.append(clause)
+        
+        structured = self._structure_clauses(clauses)
+        structured["segments"] = len(results)
+        if errors:
+            structured["failed_segments"] = len(errors)
+        return structured
+    
+    def _prepare(self, document_text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if not PREFILTER:
+            return document_text, None
+        text, report = self.prefilter(document_text)
+        print(f"🔎 Clause pre-filter: {report['passages']} passages, ~{report['tokens_saved']} tokens saved")
+        return text, report
+    
+    def _with_prefilter(self, result: Dict[str, Any], report: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if report is not None and "error" not in result:
+            result["prefilter"] = report
+        return result
+    
+    def _cached_result(self, document_text: str):
+        """(cache key, cached result or None); the key is None when no result cache is configured."""
+        if self.result_cache is None:
+            return None, None
+        key = ClauseResultCache.key(document_text, self.model_name, self.prompt_version)
+        return key, self.result_cache.get(key)
+    
+    def _cache_result(self, key: Optional[str], result: Dict[str, Any]):
+        # Errors and partial map-reduce results are retried next time rather than cached
+        if key is not None and "error" not in result and not result.get("failed_segments"):
+            self.result_cache.put(key, result)
+    
+    def extract_clauses_from_text(self, document_text: str) -> Dict[str, Any]:
+        """Extract clauses from document text using AI; long documents are split and extracted in parallel."""
+        key, cached = self._cached_result(document_text)
+        if cached is not None:
+            return cached
+        result = self._extract_clauses(document_text)
+        self._cache_result(key, result)
+        return result
+    
+    async def aextract_clauses_from_text(self, document_text: str) -> Dict[str, Any]:
+        """Async variant of extract_clauses_from_text that does not block the event loop."""
+        key, cached = self._cached_result(document_text)
+        if cached is not None:
+            return cached
+        result = await self._aextract_clauses(document_text)
+        self._cache_result(key, result)
+        return result
+    
+    def _extract_clauses(self, document_text: str) -> Dict[str, Any]:
+        document_text, report = self._prepare(document_text)
+        segments = self._segments(document_text)
+        if len(segments) > 1:
+            print(f"📑 Extracting clauses from {len(segments)} segments")
+            with ThreadPoolExecutor(max_workers=min(SEGMENT_CONCURRENCY, len(segments))) as pool:
+                return self._with_prefilter(self._merge_clauses(list(pool.map(self._extract_segment, segments))), report)
         
         try:
-            response = self.llm.invoke(prompt)
-            analysis = response.content if hasattr(response, 'content') else str(response)
+            response = self.llm.invoke(self._extraction_prompt(document_text))
+            return self._with_prefilter(self._structure_response(response), report)
             
-            # Parse the AI response and structure it
-            structured_clauses = self._parse_ai_response(analysis)
-            
-            return {
-                "clauses": structured_clauses,
-                "summary": self._generate_clause_summary(structured_clauses),
-                "total_clauses": len(structured_clauses)
-            }
+        except Exception as e:
+            print(f"❌ Error in clause extraction: {e}")
+            return {"error": f"Failed to extract clauses: {str(e)}"}
+    
+    async def _aextract_clauses(self, document_text: str) -> Dict[str, Any]:
+        document_text, report = self._prepare(document_text)
+        segments = self._segments(document_text)
+        if len(segments) > 1:
+            print(f"📑 Extracting clauses from {len(segments)} segments")
+            semaphore = asyncio.Semaphore(SEGMENT_CONCURRENCY)
+            results = await asyncio.gather(*(self._aextract_segment(segment, semaphore) for segment in segments))
+            return self._with_prefilter(self._merge_clauses(list(results)), report)
+        
+        try:
+            response = await ainvoke_llm(self.llm, self._extraction_prompt(document_text))
+            return self._with_prefilter(self._structure_response(response), report)
             
         except Exception as e:
             print(f"❌ Error in clause extraction: {e}")
             return {"error": f"Failed to extract clauses: {str(e)}"}
     
+    def _load_pdf_text(self, pdf_path: str) -> str:
+        # Load PDF (cached parse when this file was already processed)
+        documents = extract_pdf(pdf_path, cache=self.document_cache)
+        
+        # Combine all pages
+        return "\n\n".join([doc.page_content for doc in documents])
+    
     def extract_clauses_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """Extract clauses from a PDF file."""
         try:
-            # Load PDF
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            # Combine all pages
-            full_text = "\n\n".join([doc.page_content for doc in documents])
+            full_text = self._load_pdf_text(pdf_path)
             
             # Extract clauses
             return self.extract_clauses_from_text(full_text)
@@ -92,58 +450,163 @@ class ClauseExtractor:
             print(f"❌ Error processing PDF: {e}")
             return {"error": f"Failed to process PDF: {str(e)}"}
     
-    def _parse_ai_response(self, ai_response: str) -> List[Dict[str, Any]]:
-        """Parse AI response into structured clause data using regex with fallbacks."""
-        clauses = []
+    async def aextract_clauses_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
+        """Async variant of extract_clauses_from_pdf; PDF parsing runs on the parse executor."""
+        try:
+            full_text = await parse_stage.run(self._load_pdf_text, pdf_path)
+            
+        except Exception as e:
+            print(f"❌ Error processing PDF: {e}")
+            return {"error": f"Failed to process PDF: {str(e)}"}
+        
+        return await self.aextract_clauses_from_text(full_text)
+    
+    async def _astream_segment(self, segment: str, clauses: asyncio.Queue, semaphore: asyncio.Semaphore):
+        """
+        Stream one segment's extraction, putting each clause on the queue as it completes. Failures are
+        retried while nothing has been emitted yet; returns the exception once retries are exhausted or
+        after some clauses already went out (those stay delivered).
+        """
+        async with semaphore:
+            for attempt in range(SEGMENT_RETRIES + 1):
+                parser = ClauseStreamParser(self._parse_clause_block)
+                pieces = []
+                try:
+                    async with llm_slot(self.llm):
+                        async for chunk in self.llm.astream(self._extraction_prompt(segment)):
+                            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                            pieces.append(text)
+                            for clause in parser.feed(text):
+                                await clauses.put(clause)
+                except Exception as e:
+                    print(f"⚠️ Segment extraction failed (attempt {attempt + 1}): {e}")
+                    error = e
+                    if parser.clauses:
+                        return error
+                    continue
+                parser.finish()
+                
+                if not parser.blocks:
+                    # No markers at all: only the fallback parser can read it, once the output is complete
+                    for clause in self._fallback_parse(self._clean_ai_response("".join(pieces))):
+                        await clauses.put(clause)
+                return None
+            return error
+    
+    async def astream_clauses(self, document_text: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of aextract_clauses_from_text: yields {"clause": ...} as soon as the model
+        closes each clause, then {"result": ...} built from exactly the clauses that were yielded.
+        """
+        key, cached = self._cached_result(document_text)
+        if cached is not None:
+            for clause in cached.get("clauses", []):
+                yield {"clause": clause}
+            yield {"result": cached}
+            return
         
-        # Clean response by removing excessive asterisks and formatting
-        cleaned_response = self._clean_ai_response(ai_response)
+        document_text, report = self._prepare(document_text)
+        segments = self._segments(document_text)
+        clauses: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(SEGMENT_CONCURRENCY)
+        tasks = [asyncio.ensure_future(self._astream_segment(segment, clauses, semaphore)) for segment in segments]
+        finished = asyncio.ensure_future(asyncio.gather(*tasks))
         
-        # Method 1: Try to parse using CLAUSE_START/CLAUSE_END markers
-        clause_blocks = re.findall(r'CLAUSE_START(.*?)CLAUSE_END', cleaned_response, re.DOTALL | re.IGNORECASE)
+        yielded, seen = [], set()
+        try:
+            while not (finished.done() and clauses.empty()):
+                next_clause = asyncio.ensure_future(clauses.get())
+                await asyncio.wait({next_clause, finished}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_clause.done():
+                    next_clause.cancel()
+                    continue
+                clause = next_clause.result()
+                # Segments can repeat a clause that straddles their boundary
+                if self._normalize_clause(clause) not in seen:
+                    seen.add(self._normalize_clause(clause))
+                    yielded.append(clause)
+                    yield {"clause": clause}
+        finally:
+            # Client went away: stop paying for segments nobody will read
+            for task in tasks:
+                task.cancel()
         
-        if clause_blocks:
-            for block in clause_blocks:
-                clause = self._extract_clause_fields(block)
-                if clause:
-                    clauses.append(clause)
+        errors = [error for error in finished.result() if error is not None]
+        if errors and not yielded:
+            result = {"error": f"Failed to extract clauses: {str(errors[0])}"}
         else:
-            # Method 2: Fallback to old parsing method for backward compatibility
-            clauses = self._fallback_parse(cleaned_response)
+            result = self._structure_clauses(yielded)
+            if len(segments) > 1:
+                result["segments"] = len(segments)
+            if errors:
+                # Partial result: reported, but not cached
+                result["failed_segments"] = len(errors)
+        result = self._with_prefilter(result, report)
+        self._cache_result(key, result)
+        yield {"result": result}
+    
+    async def astream_clauses_from_pdf(self, pdf_path: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of aextract_clauses_from_pdf."""
+        try:
+            full_text = await parse_stage.run(self._load_pdf_text, pdf_path)
+            
+        except Exception as e:
+            print(f"❌ Error processing PDF: {e}")
+            yield {"result": {"error": f"Failed to process PDF: {str(e)}"}}
+            return
         
-        return clauses
+        async for event in self.astream_clauses(full_text):
+            yield event
+    
+    def _parse_ai_response(self, ai_response: str) -> List[Dict[str, Any]]:
+        """Parse AI response into structured clause data, falling back to section parsing without markers."""
+        # Method 1: Parse CLAUSE_START/CLAUSE_END blocks
+        parser = ClauseStreamParser(self._parse_clause_block)
+        parser.feed(ai_response)
+        parser.finish()
+        
+        if parser.blocks:
+            return parser.clauses
+        
+        # Method 2: Fallback to old parsing method for backward compatibility
+        return self._fallback_parse(self._clean_ai_response(ai_response))
+    
+    def _parse_clause_block(self, clause_block: str) -> Optional[Dict[str, Any]]:
+        # Clean block by removing excessive asterisks and formatting
+        return self._extract_clause_fields(self._clean_ai_response(clause_block))
     
     def _clean_ai_response(self, response: str) -> str:
         """Clean AI response by removing excessive formatting symbols."""
         # Remove excessive asterisks and bullet points
-        cleaned = re.sub(r'\*{2,}', '', response)  # Remove multiple asterisks
-        cleaned = re.sub(r'^\s*[\*\-\•]\s*', '', cleaned, flags=re.MULTILINE)  # Remove bullet points
-        cleaned = re.sub(r'\*([^\*]+)\*', r'\1', cleaned)  # Remove single asterisk emphasis
-        cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)  # Reduce multiple newlines
+        cleaned = MULTIPLE_ASTERISKS.sub('', response)  # Remove multiple asterisks
+        cleaned = LEADING_BULLET.sub('', cleaned)  # Remove bullet points
+        cleaned = ASTERISK_EMPHASIS.sub(r'\1', cleaned)  # Remove single asterisk emphasis
+        cleaned = EXTRA_NEWLINES.sub('\n\n', cleaned)  # Reduce multiple newlines
         return cleaned.strip()
     
-    def _extract_clause_fields(self, clause_block: str) -> Dict[str, Any]:
-        """Extract clause fields from a clause block using regex."""
-        clause = {}
-        
-        # Define regex patterns for each field
-        patterns = {
-            'type': r'Type:\s*([^\n]+)',
-            'text': r'Text:\s*([^\n]+(?:\n(?!(?:Key Points|Risk Level|Analysis):)[^\n]*)*)',
-            'key_points': r'Key Points:\s*([^\n]+(?:\n(?!(?:Risk Level|Analysis):)[^\n]*)*)',
-            'risk_level': r'Risk Level:\s*([^\n]+)',
-            'analysis': r'Analysis:\s*([^\n]+(?:\n(?!(?:Type|Text|Key Points|Risk Level):)[^\n]*)*)'
-        }
-        
-        for field, pattern in patterns.items():
-            match = re.search(pattern, clause_block, re.IGNORECASE | re.DOTALL)
+    def _extract_clause_fields(self, clause_block: str) -> Optional[Dict[str, Any]]:
+        """Extract clause fields from a clause block in one pass over its lines."""
+        values: Dict[str, List[str]] = {}
+        current = None
+        for line in clause_block.splitlines():
+            match = FIELD_LABEL.match(line)
             if match:
-                value = match.group(1).strip()
-                # Further clean the extracted value
-                value = re.sub(r'^[\*\-\•]\s*', '', value, flags=re.MULTILINE)
-                clause[field] = value
-            else:
-                clause[field] = 'Not specified'
+                field = FIELD_NAMES[match.group(1).lower()]
+                # The first occurrence of a label wins; repeated labels and their lines are ignored
+                current = field if field not in values else None
+                if current is not None:
+                    values[current] = [match.group(2)]
+            elif current is not None and current not in SINGLE_LINE_FIELDS:
+                values[current].append(line)
+            elif current is not None and not values[current][0].strip():
+                # "Type:" alone on its line: the value is on the next non-empty line
+                values[current] = [line]
+        
+        clause = {}
+        for field in FIELD_NAMES.values():
+            value = "\n".join(values.get(field, [])).strip()
+            # Further clean the extracted value
+            clause[field] = LEADING_BULLET.sub('', value) if value else 'Not specified'
         
         return clause if any(v != 'Not specified' for v in clause.values()) else None
     
@@ -241,35 +704,151 @@ class ClauseExtractor:
         
         return risk_analysis
     
-    def compare_clauses(self, document1_clauses: List[Dict], document2_clauses: List[Dict]) -> Dict[str, Any]:
-        """Compare clauses between two documents."""
+    @staticmethod
+    def _normalize_clause(clause: Dict[str, Any]) -> Tuple[str, str]:
+        return (re.sub(r'\W+', ' ', clause.get('type', '')).strip().lower(),
+                re.sub(r'\W+', ' ', clause.get('text', '')).strip().lower())
+    
+    def align_clauses(self, document1_clauses: List[Dict], document2_clauses: List[Dict]) -> Dict[str, Any]:
+        """
+        Pair clauses across two documents without the LLM: identical type and wording is "unchanged",
+        otherwise the most similar clause of the same type (by embedding) is paired as "changed".
+        """
+        keys1 = [self._normalize_clause(clause) for clause in document1_clauses]
+        keys2 = [self._normalize_clause(clause) for clause in document2_clauses]
+        unchanged, changed = [], []
+        matched1, matched2 = set(), set()
+        
+        # Identical clauses first
+        positions2: Dict[Tuple[str, str], List[int]] = {}
+        for j, key in enumerate(keys2):
+            positions2.setdefault(key, []).append(j)
+        for i, key in enumerate(keys1):
+            if positions2.get(key):
+                j = positions2[key].pop(0)
+                matched1.add(i)
+                matched2.add(j)
+                unchanged.append({"type": document1_clauses[i].get('type', 'Unknown'),
+                                  "document1": document1_clauses[i], "document2": document2_clauses[j],
+                                  "similarity": 1.0})
         
-        comparison_prompt = f"""
+        rest1 = [i for i in range(len(document1_clauses)) if i not in matched1]
+        rest2 = [j for j in range(len(document2_clauses)) if j not in matched2]
+        if rest1 and rest2 and self.embeddings is not None:
+            vectors = np.asarray(self.embeddings.embed_documents(
+                [document1_clauses[i].get('text', '') for i in rest1] +
+                [document2_clauses[j].get('text', '') for j in rest2]
+            ), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            similarity = vectors[:len(rest1)] @ vectors[len(rest1):].T
+            
+            # Greedy one-to-one assignment, best pairs first
+            candidates = []
+            for a, i in enumerate(rest1):
+                for b, j in enumerate(rest2):
+                    score = float(similarity[a, b])
+                    same_type = keys1[i][0] == keys2[j][0]
+                    if score >= (MATCH_THRESHOLD if same_type else CROSS_TYPE_THRESHOLD):
+                        candidates.append((score, i, j))
+            for score, i, j in sorted(candidates, reverse=True):
+                if i in matched1 or j in matched2:
+                    continue
+                matched1.add(i)
+                matched2.add(j)
+                changed.append({"type": document1_clauses[i].get('type', 'Unknown'),
+                                "document1": document1_clauses[i], "document2": document2_clauses[j],
+                                "similarity": round(score, 4)})
+        
+        return {
+            "unchanged": unchanged,
+            "changed": changed,
+            "only_in_document1": [clause for i, clause in enumerate(document1_clauses) if i not in matched1],
+            "only_in_document2": [clause for j, clause in enumerate(document2_clauses) if j not in matched2],
+        }
+    
+    @staticmethod
+    def _format_clause(clause: Dict[str, Any]) -> str:
+        return f"[{clause.get('type', 'Unknown')}] (Risk: {clause.get('risk_level', 'Unknown')}) {clause.get('text', '')}"
+    
+    def _comparison_prompt(self, alignment: Dict[str, Any]) -> Optional[str]:
+        """Prompt covering only changed and unmatched clauses; None when the documents do not differ."""
+        if not (alignment["changed"] or alignment["only_in_document1"] or alignment["only_in_document2"]):
+            return None
+        
+        changed = "\n\n".join(
+            f"Pair {n}:\nDocument 1: {self._format_clause(pair['document1'])}\n"
+            f"Document 2: {self._format_clause(pair['document2'])}"
+            for n, pair in enumerate(alignment["changed"], 1)
+        ) or "None"
+        only1 = "\n".join(self._format_clause(clause) for clause in alignment["only_in_document1"]) or "None"
+        only2 = "\n".join(self._format_clause(clause) for clause in alignment["only_in_document2"]) or "None"
+        unchanged_types = ", ".join(sorted({pair["type"] for pair in alignment["unchanged"]})) or "none"
+        
+        return f"""
         Compare the following clauses from two different legal documents and provide:
         1. Common clause types
         2. Differences in terms
         3. Risk comparison
         4. Recommendations for alignment
         
-        Document 1 Clauses:
-        {document1_clauses}
+        {len(alignment["unchanged"])} clauses are identical in both documents and are not listed (types: {unchanged_types}).
+        
+        Changed Clauses (same clause, different wording):
+        {changed}
         
-        Document 2 Clauses:
-        {document2_clauses}
+        Only in Document 1:
+        {only1}
+        
+        Only in Document 2:
+        {only2}
         
         Provide a detailed comparison analysis.
         """
-        
-        try:
-            response = self.llm.invoke(comparison_prompt)
+    
+    def _structure_comparison(self, response, alignment: Dict[str, Any], document1_clauses: List[Dict],
+                              document2_clauses: List[Dict]) -> Dict[str, Any]:
+        if response is None:
+            cleaned_analysis = "Both documents contain the same clauses with identical wording."
+        else:
             analysis = response.content if hasattr(response, 'content') else str(response)
             cleaned_analysis = self._clean_ai_response(analysis)
-            
-            return {
-                "comparison_analysis": cleaned_analysis,
-                "doc1_clause_count": len(document1_clauses),
-                "doc2_clause_count": len(document2_clauses)
+        
+        return {
+            "comparison_analysis": cleaned_analysis,
+            "doc1_clause_count": len(document1_clauses),
+            "doc2_clause_count": len(document2_clauses),
+            "alignment": {
+                "unchanged": len(alignment["unchanged"]),
+                "changed": [
+                    {"type": pair["type"], "similarity": pair["similarity"],
+                     "document1_text": pair["document1"].get('text', ''),
+                     "document2_text": pair["document2"].get('text', '')}
+                    for pair in alignment["changed"]
+                ],
+                "unchanged_types": [pair["type"] for pair in alignment["unchanged"]],
+                "only_in_document1": [clause.get('type', 'Unknown') for clause in alignment["only_in_document1"]],
+                "only_in_document2": [clause.get('type', 'Unknown') for clause in alignment["only_in_document2"]],
             }
+        }
+    
+    def compare_clauses(self, document1_clauses: List[Dict], document2_clauses: List[Dict]) -> Dict[str, Any]:
+        """Compare clauses between two documents; only clauses that differ are sent to the LLM."""
+        try:
+            alignment = self.align_clauses(document1_clauses, document2_clauses)
+            prompt = self._comparison_prompt(alignment)
+            response = self.llm.invoke(prompt) if prompt else None
+            return self._structure_comparison(response, alignment, document1_clauses, document2_clauses)
+            
+        except Exception as e:
+            return {"error": f"Failed to compare clauses: {str(e)}"}
+    
+    async def acompare_clauses(self, document1_clauses: List[Dict], document2_clauses: List[Dict]) -> Dict[str, Any]:
+        """Async variant of compare_clauses; clause embeddings run on the embed executor."""
+        try:
+            alignment = await embed_stage.run(self.align_clauses, document1_clauses, document2_clauses)
+            prompt = self._comparison_prompt(alignment)
+            response = await ainvoke_llm(self.llm, prompt) if prompt else None
+            return self._structure_comparison(response, alignment, document1_clauses, document2_clauses)
             
         except Exception as e:
             return {"error": f"Failed to compare clauses: {str(e)}"}
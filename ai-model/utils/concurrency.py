@@ -0,0 +1,87 @@
+import os
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from utils.llm_pool import llm_clients
+
+
+class Stage:
+    """A pipeline stage with its own executor and in-flight limit, so one slow stage cannot starve the others."""
+
+    def __init__(self, name: str, workers: int, limit: Optional[int] = None):
+        self.name = name
+        self.workers = workers
+        self.limit = limit or workers
+        # workers=0 means the stage only limits concurrency of natively async calls
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) if workers else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        async with self.semaphore:
+            self.waiting -= 1
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call on this stage's executor without blocking the event loop."""
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+        }
+
+
+# PDF loading, OCR and vectorstore loads
+parse_stage = Stage("parse", workers=int(os.getenv("PARSE_WORKERS", "4")))
+# Embedding, vector search and re-ranking; torch and faiss release the GIL
+embed_stage = Stage("embed", workers=int(os.getenv("EMBED_WORKERS", "2")))
+# Gemini calls are awaited natively, this only caps how many are in flight at once
+llm_stage = Stage("llm", workers=0, limit=int(os.getenv("LLM_CONCURRENCY", "16")))
+
+
+@asynccontextmanager
+async def llm_slot(llm):
+    """Per-model limit of the shared client pool, then the global LLM limit."""
+    # Model slot first, so calls queued behind a saturated model do not hold global slots
+    async with llm_clients.slot(getattr(llm, "model", "")), llm_stage.slot():
+        yield
+
+
+async def ainvoke_llm(llm, prompt):
+    async with llm_slot(llm):
+        return await llm.ainvoke(prompt)
+
+
+async def arun_chain(chain, query: str):
+    llm = chain.combine_documents_chain.llm_chain.llm
+    async with llm_slot(llm):
+        return await chain.arun(query)
+
+
+def stage_stats() -> dict:
+    return {stage.name: stage.stats() for stage in (parse_stage, embed_stage, llm_stage)}
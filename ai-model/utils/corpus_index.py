@@ -0,0 +1,124 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from langchain.schema import Document
+from utils.lexical_index import LexicalIndex, hybrid_rank
+from utils.vector_index import build_index, exact_l2, row_vectors, store_document, store_size, store_vectors
+
+
+class CorpusIndex:
+    """Single FAISS index over all predefined legal document stores."""
+
+    def __init__(self, embeddings, index_type: str = "flat", storage: str = "float32",
+                 hybrid: bool = True, candidates: int = 50):
+        self.embeddings = embeddings
+        self.index_type = index_type
+        self.storage = storage
+        self.hybrid = hybrid
+        self.candidates = candidates
+        self.index = None
+        self.lexical: Optional[LexicalIndex] = None
+        self.source_names: List[str] = []
+        # Compact per-chunk arrays: which store a vector came from and its row in that store
+        self.source_ids = np.zeros(0, dtype=np.int16)
+        self.local_ids = np.zeros(0, dtype=np.int32)
+        self._stores = []
+
+    @property
+    def size(self) -> int:
+        return 0 if self.index is None else self.index.ntotal
+
+    def build(self, stores: Dict[str, object]):
+        """Merge the vectors of every store into one index of the configured type and storage."""
+        vectors, source_ids, local_ids = [], [], []
+        self.source_names = []
+        self._stores = []
+
+        for name, vs in stores.items():
+            count = store_size(vs)
+            if count == 0:
+                continue
+            source_id = len(self.source_names)
+            vectors.append(store_vectors(vs))
+            source_ids.append(np.full(count, source_id, dtype=np.int16))
+            local_ids.append(np.arange(count, dtype=np.int32))
+            self.source_names.append(name)
+            self._stores.append(vs)
+
+        if not vectors:
+            self.index = None
+            return self
+
+        self.index, _ = build_index(np.vstack(vectors), self.index_type, storage=self.storage)
+        self.source_ids = np.concatenate(source_ids)
+        self.local_ids = np.concatenate(local_ids)
+        if self.hybrid:
+            self.lexical = LexicalIndex.build([self.get_document(i).page_content for i in range(self.size)])
+
+        print(f"✅ Corpus index built: {self.size} chunks from {len(self.source_names)} sources.")
+        return self
+
+    def get_document(self, global_id: int) -> Document:
+        vs = self._stores[self.source_ids[global_id]]
+        return store_document(vs, int(self.local_ids[global_id]))
+
+    def source_of(self, global_id: int) -> str:
+        return self.source_names[self.source_ids[global_id]]
+
+    def _source_mask(self, sources: Optional[List[str]]):
+        if not sources:
+            return None
+        wanted = [i for i, name in enumerate(self.source_names) if name in sources]
+        return np.isin(self.source_ids, wanted)
+
+    def _dense_search(self, query_vector: np.ndarray, k: int, mask) -> List[Tuple[int, float]]:
+        # Restricted searches over-fetch until enough hits from the requested sources are found
+        fetch_k = min(self.size, k if mask is None else k * max(2, len(self.source_names)))
+        while True:
+            scores, ids = self.index.search(query_vector, fetch_k)
+            hits = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+            if mask is not None:
+                hits = [(i, s) for i, s in hits if mask[i]]
+            if len(hits) >= k or fetch_k >= self.size:
+                return hits[:k]
+            fetch_k = min(self.size, fetch_k * 4)
+
+    def _rescore(self, query_vector: np.ndarray, global_ids: np.ndarray) -> np.ndarray:
+        vectors = np.vstack([
+            row_vectors(self._stores[self.source_ids[i]], [int(self.local_ids[i])]) for i in global_ids
+        ])
+        return exact_l2(query_vector, vectors)
+
+    def search(self, query: str, k: int = 5, sources: Optional[List[str]] = None) -> List[Tuple[Document, float, str]]:
+        """Embed the query once and return the global top-k (document, L2 score, source)."""
+        if self.index is None:
+            return []
+
+        query_vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        mask = self._source_mask(sources)
+        if mask is not None and not mask.any():
+            return []
+
+        if self.lexical is None:
+            hits = self._dense_search(query_vector, k, mask)
+        else:
+            # Hybrid: BM25 catches exact identifiers ("Section 302") that MiniLM blurs, fused with RRF
+            dense = self._dense_search(query_vector, self.candidates, mask)
+            lexical_ids, _ = self.lexical.search(query, self.candidates)
+            if mask is not None:
+                lexical_ids = lexical_ids[mask[lexical_ids]]
+            hits = hybrid_rank(
+                np.asarray([i for i, _ in dense], dtype=np.int64),
+                np.asarray([s for _, s in dense], dtype=np.float32),
+                lexical_ids,
+                rescore=lambda ids: self._rescore(query_vector, ids),
+                k=k,
+            )
+
+        results = []
+        for global_id, score in hits:
+            doc = self.get_document(global_id)
+            if doc is None:
+                continue
+            source = self.source_of(global_id)
+            results.append((doc, score, doc.metadata.get("source", source)))
+        return results
@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Callable, List, Optional
+from langchain.schema import Document
+
+
+def parser_signature() -> str:
+    """Settings that change extraction output; cached parses from other settings are ignored."""
+    from utils.ocr import OCR_DPI, OCR_LANG
+    from utils.page_router import MIN_LETTER_RATIO, MIN_TEXT_CHARS, ROUTER_VERSION
+    from utils.pdf_extraction import PDF_BACKEND, PDF_INCLUDE_BLOCKS
+    return (f"{PDF_BACKEND}:{int(PDF_INCLUDE_BLOCKS)}:{OCR_DPI}:{OCR_LANG}:{MIN_TEXT_CHARS}:{MIN_LETTER_RATIO}:"
+            f"{ROUTER_VERSION}")
+
+
+class ParsedDocumentCache:
+    """Persistent per-page text of parsed PDFs keyed by file content hash, shared by every document endpoint."""
+
+    def __init__(self, path: str, signature: Optional[str] = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.signature = signature or parser_signature()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, signature TEXT, "
+                         "pages INTEGER, routes TEXT, created REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pages (file_hash TEXT, page INTEGER, text TEXT, method TEXT, "
+                         "metadata TEXT, PRIMARY KEY (file_hash, page))")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_hash: str) -> Optional[List[Document]]:
+        with self._lock:
+            row = self._db.execute("SELECT signature FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+            if row is None or row[0] != self.signature:
+                self.misses += 1
+                return None
+            rows = self._db.execute("SELECT text, metadata FROM pages WHERE file_hash = ? ORDER BY page",
+                                    (file_hash,)).fetchall()
+            self.hits += 1
+        return [Document(page_content=text, metadata=json.loads(metadata)) for text, metadata in rows]
+
+    def put(self, file_hash: str, docs: List[Document], routes: Optional[dict] = None):
+        rows = [
+            (file_hash, doc.metadata.get("page", i), doc.page_content, doc.metadata.get("extraction", "text"),
+             json.dumps(doc.metadata, default=str))
+            for i, doc in enumerate(docs)
+        ]
+        with self._lock:
+            self._db.execute("DELETE FROM pages WHERE file_hash = ?", (file_hash,))
+            self._db.executemany("INSERT OR REPLACE INTO pages (file_hash, page, text, method, metadata) "
+                                 "VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO files (file_hash, signature, pages, routes, created) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (file_hash, self.signature, len(docs), json.dumps(routes or {}), time.time()))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "files": files,
+        }
+
+
+def extract_pdf(path: str, cache: Optional[ParsedDocumentCache] = None, file_hash: Optional[str] = None,
+                progress: Optional[Callable[[int, int], None]] = None) -> List[Document]:
+    """Page-routed extraction of a PDF file, served from the cache when the same bytes were parsed before."""
+    from utils.page_router import route_pages
+
+    if cache is not None and file_hash is None:
+        with open(path, "rb") as f:
+            file_hash = hashlib.md5(f.read()).hexdigest()
+    if cache is not None:
+        cached = cache.get(file_hash)
+        if cached is not None:
+            return cached
+
+    docs, routes = route_pages(path, progress=progress)
+    if cache is not None and docs:
+        cache.put(file_hash, docs, routes)
+    return docs
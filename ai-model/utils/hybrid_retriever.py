@@ -0,0 +1,54 @@
+import os
+from typing import Any, List
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+from utils.lexical_index import ensure_lexical_index, hybrid_rank
+from utils.vector_index import exact_l2, row_vectors, store_document
+
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever that fuses dense FAISS results with BM25 results using reciprocal-rank fusion,
+    optionally over-fetching and re-ranking the fused list with a cross-encoder.
+    """
+
+    vectorstore: Any
+    lexical: Any = None
+    reranker: Any = None
+    k: int = 4
+    fetch_k: int = 4
+    candidates: int = HYBRID_CANDIDATES
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        embedding = self.vectorstore.embeddings.embed_query(query)
+        fetch_k = max(self.k, self.fetch_k) if self.reranker else self.k
+
+        if self.lexical is None:
+            ids, _ = self.vectorstore.search_ids(embedding, fetch_k)
+            docs = [store_document(self.vectorstore, int(doc_id)) for doc_id in ids]
+        else:
+            dense_ids, dense_scores = self.vectorstore.search_ids(embedding, max(self.candidates, fetch_k))
+            lexical_ids, _ = self.lexical.search(query, max(self.candidates, fetch_k))
+
+            query_vector = np.asarray([embedding], dtype=np.float32)
+            ranked = hybrid_rank(
+                dense_ids, dense_scores, lexical_ids,
+                rescore=lambda ids: exact_l2(query_vector, row_vectors(self.vectorstore, ids)),
+                k=fetch_k,
+            )
+            docs = [store_document(self.vectorstore, doc_id) for doc_id, _ in ranked]
+
+        if self.reranker:
+            docs = self.reranker.rerank(query, docs, lambda doc: doc.page_content, top_n=self.k)
+        return docs[:self.k]
+
+
+def make_retriever(vectorstore, path: str = None, k: int = 4, reranker=None, fetch_k: int = 20):
+    """Hybrid (and optionally re-ranking) retriever for stores with row-level search, plain dense otherwise."""
+    if not hasattr(vectorstore, "search_ids") or not (HYBRID_RETRIEVAL or reranker):
+        return vectorstore.as_retriever(search_kwargs={"k": k})
+    lexical = ensure_lexical_index(vectorstore, path) if HYBRID_RETRIEVAL else None
+    return HybridRetriever(vectorstore=vectorstore, lexical=lexical, reranker=reranker, k=k, fetch_k=fetch_k)
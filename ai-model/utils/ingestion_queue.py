@@ -0,0 +1,122 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class IngestionQueue:
+    """Runs document ingestion on a bounded worker pool and tracks per-file job status."""
+
+    def __init__(self, pipeline: Callable[[bytes, str, Callable[[str, float], None]], object],
+                 max_workers: int = 2, max_pending: int = 32, is_ready: Optional[Callable[[str], bool]] = None,
+                 finished_ttl: float = 3600, max_finished: int = 1000):
+        self.pipeline = pipeline
+        self.max_pending = max_pending
+        # Whether a "ready" job's output still exists (stores can be deduplicated or cleaned up later)
+        self.is_ready = is_ready
+        # Finished jobs are kept for status polling, then forgotten
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, dict] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        """Forget finished jobs older than finished_ttl, and the oldest beyond max_finished."""
+        now = time.time()
+        finished = sorted(
+            (job["updated_at"], file_id) for file_id, job in self._jobs.items()
+            if job["status"] in ("ready", "failed")
+        )
+        excess = len(finished) - self.max_finished
+        for i, (updated_at, file_id) in enumerate(finished):
+            if i < excess or now - updated_at > self.finished_ttl:
+                del self._jobs[file_id]
+
+    def _stale(self, job: dict) -> bool:
+        return job["status"] == "ready" and self.is_ready is not None and not self.is_ready(job["file_id"])
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def _report(self, file_id: str, stage: str, progress: float):
+        with self._lock:
+            job = self._jobs[file_id]
+            job.update(status="running", stage=stage, progress=round(progress, 2), updated_at=time.time())
+
+    def _run(self, file_id: str, file_bytes: bytes):
+        try:
+            self.pipeline(file_bytes, file_id, lambda stage, progress: self._report(file_id, stage, progress))
+        except Exception as e:
+            print(f"❌ Ingestion failed for {file_id}: {e}")
+            with self._lock:
+                self._jobs[file_id].update(status="failed", error=str(e), updated_at=time.time())
+                self._futures.pop(file_id, None)
+            raise
+        with self._lock:
+            self._jobs[file_id].update(status="ready", stage="ready", progress=1.0, updated_at=time.time())
+            # Waiters already hold the future; the status is all later callers need
+            self._futures.pop(file_id, None)
+
+    def submit(self, file_id: str, file_bytes: bytes) -> dict:
+        """
+        Queue a file for ingestion; a file already queued, running or ready is not processed again,
+        unless its ready store has since disappeared.
+        """
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(file_id)
+            if job is not None and job["status"] != "failed" and not self._stale(job):
+                return dict(job)
+            if self._pending_count() >= self.max_pending:
+                raise QueueFullError("Ingestion queue is full, try again later.")
+            now = time.time()
+            self._jobs[file_id] = {
+                "file_id": file_id,
+                "status": "queued",
+                "stage": "queued",
+                "progress": 0.0,
+                "error": None,
+                "submitted_at": now,
+                "updated_at": now,
+            }
+            self._futures[file_id] = self._executor.submit(self._run, file_id, file_bytes)
+            return dict(self._jobs[file_id])
+
+    def status(self, file_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(file_id)
+            if job is not None and self._stale(job):
+                del self._jobs[file_id]
+                return None
+            return dict(job) if job is not None else None
+
+    def is_pending(self, file_id: str) -> bool:
+        job = self.status(file_id)
+        return job is not None and job["status"] in ("queued", "running")
+
+    async def wait(self, file_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait without blocking the event loop until the job finishes or the timeout passes."""
+        future = self._futures.get(file_id)
+        if future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                pass  # Failure is recorded in the job status
+        return self.status(file_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._prune()
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"jobs": len(self._jobs), "in_flight": len(self._futures), "max_pending": self.max_pending, **counts}
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+LEXICAL_POSTINGS_FILE = "lexical.npz"
+LEXICAL_VOCAB_FILE = "lexical_vocab.json"
+
+# Keeps legal identifiers intact: "302", "376B", "XXXIX", "21A"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to was were what which who with "
+    "does do say says explain tell me about".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 inverted index with CSR-packed postings (doc ids as uint32, term frequencies as uint16)."""
+
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_lengths: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(doc_lengths)
+        self.avgdl = float(doc_lengths.mean()) if self.num_docs else 0.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "LexicalIndex":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.uint32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, min(tf, 65535)))
+
+        vocab = {term: i for i, term in enumerate(sorted(postings))}
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for term, i in vocab.items():
+            offsets[i + 1] = len(postings[term])
+        offsets = np.cumsum(offsets)
+
+        doc_ids = np.empty(offsets[-1], dtype=np.uint32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for term, i in vocab.items():
+            entries = np.asarray(postings[term], dtype=np.int64)
+            doc_ids[offsets[i]:offsets[i + 1]] = entries[:, 0]
+            tfs[offsets[i]:offsets[i + 1]] = entries[:, 1]
+        return cls(vocab, offsets, doc_ids, tfs, doc_lengths)
+
+    def save(self, path: str):
+        np.savez(os.path.join(path, LEXICAL_POSTINGS_FILE), offsets=self.offsets, doc_ids=self.doc_ids,
+                 tfs=self.tfs, doc_lengths=self.doc_lengths)
+        with open(os.path.join(path, LEXICAL_VOCAB_FILE), "w", encoding="utf-8") as f:
+            json.dump(sorted(self.vocab, key=self.vocab.get), f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        postings_path = os.path.join(path, LEXICAL_POSTINGS_FILE)
+        if not os.path.exists(postings_path):
+            return None
+        with open(os.path.join(path, LEXICAL_VOCAB_FILE), encoding="utf-8") as f:
+            vocab = {term: i for i, term in enumerate(json.load(f))}
+        data = np.load(postings_path)
+        return cls(vocab, data["offsets"], data["doc_ids"], data["tfs"], data["doc_lengths"])
+
+    def search(self, query: str, k: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc ids, BM25 scores) of the top-k documents for the query."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = False
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            ids = self.doc_ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            idf = np.log(1 + (self.num_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[ids] / max(self.avgdl, 1e-9))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+            matched = True
+
+        if not matched:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        k = min(k, int(np.count_nonzero(scores)))
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.num_docs else np.arange(self.num_docs)
+        top = top[np.argsort(-scores[top])][:k]
+        return top.astype(np.int64), scores[top]
+
+
+def ensure_lexical_index(vs, path: Optional[str] = None) -> LexicalIndex:
+    """Return the store's lexical index, loading or building (and persisting) it on first use."""
+    from utils.vector_index import store_document, store_size
+
+    lexical = getattr(vs, "lexical_index", None)
+    if lexical is None and path:
+        lexical = LexicalIndex.load(path)
+    if lexical is None:
+        lexical = LexicalIndex.build([store_document(vs, i).page_content for i in range(store_size(vs))])
+        if path and os.path.isdir(path):
+            lexical.save(path)
+    vs.lexical_index = lexical
+    return lexical
+
+
+def rrf_fuse(rankings: Sequence[Sequence[int]], rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """Reciprocal-rank fusion of several ranked id lists."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybrid_rank(dense_ids: np.ndarray, dense_scores: np.ndarray, lexical_ids: np.ndarray,
+                rescore: Optional[Callable[[np.ndarray], np.ndarray]] = None, k: int = 5,
+                rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse dense and BM25 rankings with RRF and return (id, dense L2 score) for the top-k.
+    Lexical candidates missing from the dense list are re-scored against their vectors first,
+    so they are ranked on both sides instead of only the lexical one.
+    """
+    dense = {int(i): float(s) for i, s in zip(dense_ids, dense_scores)}
+    extra = np.asarray([i for i in lexical_ids if int(i) not in dense], dtype=np.int64)
+    if rescore is not None and extra.size:
+        dense.update({int(i): float(s) for i, s in zip(extra, rescore(extra))})
+
+    dense_ranking = sorted(dense, key=dense.get)
+    fused = rrf_fuse([dense_ranking, lexical_ids], rrf_k)[:k]
+    return [(doc_id, dense.get(doc_id, float("inf"))) for doc_id, _ in fused]
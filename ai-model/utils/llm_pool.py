@@ -0,0 +1,134 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+import httpx
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+class PooledTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Keep-alive connection pools for one client's sync and async calls. ChatGoogleGenerativeAI hands the
+    same client_args to both httpx clients, so one transport object has to serve both; passing a
+    transport also keeps the SDK on httpx for async calls instead of its own aiohttp session.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self.sync = httpx.HTTPTransport(limits=limits)
+        self.async_ = httpx.AsyncHTTPTransport(limits=limits)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.sync.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.async_.handle_async_request(request)
+
+    def close(self):
+        self.sync.close()
+
+    async def aclose(self):
+        await self.async_.aclose()
+
+
+class LLMClientPool:
+    """
+    Process-wide registry of long-lived Gemini clients keyed by model and generation parameters.
+    Each client owns keep-alive HTTP connection pools (sync and async), so connections stay open
+    across requests instead of paying a new TCP/TLS handshake and client setup per call.
+    """
+
+    def __init__(self, pool_size: int = 1, default_limit: int = 8, model_limits: Optional[Dict[str, int]] = None,
+                 max_connections: int = 8, keepalive_seconds: float = 120.0, timeout_seconds: Optional[float] = 300.0,
+                 base_url: Optional[str] = None):
+        # Clients per (model, params) key, handed out round-robin to spread concurrent calls over connections
+        self.pool_size = max(1, pool_size)
+        self.default_limit = default_limit
+        self.model_limits = model_limits or {}
+        # Open connections per client and how long idle ones are kept for reuse
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        # Longest wait for a connection or for the next bytes of a response, so a stalled call gives
+        # its model slot back instead of holding it forever (None = wait indefinitely)
+        self.timeout_seconds = timeout_seconds
+        self.base_url = base_url
+        self._clients: Dict[Tuple[str, str], List[ChatGoogleGenerativeAI]] = {}
+        self._next: Dict[Tuple[str, str], int] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(model: str, api_key: str, params: dict) -> Tuple[str, str]:
+        api_key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return model, json.dumps({"api_key": api_key_hash, **params}, sort_keys=True, default=str)
+
+    def get(self, model: str, api_key: str, **params) -> ChatGoogleGenerativeAI:
+        """Shared client for this model and generation parameters, created on first use."""
+        key = self._key(model, api_key, params)
+        with self._lock:
+            clients = self._clients.setdefault(key, [])
+            if len(clients) < self.pool_size:
+                clients.append(self._create(model, api_key, params))
+                self.created += 1
+                return clients[-1]
+            self.reused += 1
+            position = self._next.get(key, 0)
+            self._next[key] = (position + 1) % len(clients)
+            return clients[position]
+
+    def _create(self, model: str, api_key: str, params: dict) -> ChatGoogleGenerativeAI:
+        # The default SDK client picks its own pool settings (and aiohttp for async calls); give it
+        # explicit keep-alive httpx pools instead so reuse and pool size are under our control
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections,
+                              keepalive_expiry=self.keepalive_seconds)
+        params = {"timeout": self.timeout_seconds, **params}
+        return ChatGoogleGenerativeAI(model=model, google_api_key=api_key, base_url=self.base_url,
+                                      client_args={"transport": PooledTransport(limits)}, **params)
+
+    def limit_for(self, model: str) -> int:
+        return self.model_limits.get(model, self.default_limit)
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        """Per-model in-flight limit, so one slow model cannot take every request slot."""
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(model, asyncio.Semaphore(self.limit_for(model)))
+        async with semaphore:
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            try:
+                yield
+            finally:
+                self._in_flight[model] -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": sum(len(clients) for clients in self._clients.values()),
+                "configurations": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "pool_size": self.pool_size,
+                "max_connections": self.max_connections,
+                "keepalive_seconds": self.keepalive_seconds,
+                "timeout_seconds": self.timeout_seconds,
+                "in_flight": {model: count for model, count in self._in_flight.items() if count},
+                "limits": {model: self.limit_for(model) for model in {key[0] for key in self._clients}},
+            }
+
+
+# e.g. LLM_MODEL_LIMITS='{"models/gemini-2.5-pro": 4}'
+llm_clients = LLMClientPool(
+    pool_size=int(os.getenv("LLM_POOL_SIZE", "2")),
+    default_limit=int(os.getenv("LLM_MODEL_CONCURRENCY", "8")),
+    model_limits=json.loads(os.getenv("LLM_MODEL_LIMITS", "{}")),
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "8")),
+    keepalive_seconds=float(os.getenv("LLM_KEEPALIVE_SECONDS", "120")),
+    timeout_seconds=float(os.getenv("LLM_TIMEOUT_SECONDS", "300")) or None,
+    base_url=os.getenv("LLM_BASE_URL") or None,
+)
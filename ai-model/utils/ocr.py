@@ -0,0 +1,79 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# Pages rasterized/OCR'd at once; bounds memory to roughly this many page bitmaps
+OCR_BATCH_PAGES = int(os.getenv("OCR_BATCH_PAGES", str(2 * OCR_WORKERS)))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker():
+    # One tesseract thread per process; parallelism comes from the pool
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    # Spawned workers do not see main's pytesseract setup, only the (dotenv-loaded) environment
+    tesseract_path = os.getenv("TESSERACT_PATH")
+    if tesseract_path:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that already runs torch/faiss threads can deadlock
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_worker)
+    return _pool
+
+
+def _ocr_page(pdf_path: str, page_number: int, dpi: int, lang: str) -> Tuple[int, str]:
+    """Rasterize and OCR a single page (1-based) inside a worker process."""
+    from pdf2image import convert_from_path
+    import pytesseract
+
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True)
+    text = pytesseract.image_to_string(images[0], lang=lang) if images else ""
+    return page_number, text.strip()
+
+
+def page_count(pdf_path: str) -> int:
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def ocr_pdf_pages(pdf_path: str, dpi: Optional[int] = None, batch_pages: Optional[int] = None,
+                  pages: Optional[List[int]] = None,
+                  progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) in page order. At most batch_pages pages are in flight, each rasterized
+    inside its worker, so memory stays flat no matter how long the document is.
+    """
+    dpi = dpi or OCR_DPI
+    batch_pages = max(1, batch_pages or OCR_BATCH_PAGES)
+    pages = pages if pages is not None else list(range(1, page_count(pdf_path) + 1))
+    pool = _get_pool()
+
+    pending = deque()
+    next_page = iter(pages)
+    done = 0
+    for page_number in next_page:
+        pending.append(pool.submit(_ocr_page, pdf_path, page_number, dpi, OCR_LANG))
+        if len(pending) >= batch_pages:
+            break
+
+    while pending:
+        page_number, text = pending.popleft().result()
+        # Keep the window full while the caller consumes results
+        for following in next_page:
+            pending.append(pool.submit(_ocr_page, pdf_path, following, dpi, OCR_LANG))
+            break
+        done += 1
+        if progress:
+            progress(done, len(pages))
+        yield page_number, text
@@ -0,0 +1,92 @@
+import os
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain.schema import Document
+
+# A page with less text than this is treated as a scan (stray page numbers, headers, stamps)
+MIN_TEXT_CHARS = int(os.getenv("PAGE_MIN_TEXT_CHARS", "40"))
+# Below this share of readable characters (letters, digits, common punctuation) among non-space characters
+# the text layer is considered garbage
+MIN_LETTER_RATIO = float(os.getenv("PAGE_MIN_LETTER_RATIO", "0.5"))
+# Bump when classification changes so cached parses from older rules are redone
+ROUTER_VERSION = 2
+
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+# Punctuation and symbols of fee tables, payment schedules and citations
+COMMON_PUNCTUATION = set(".,;:!?'\"()[]{}/-–—%&@#*+=<>₹$€£§")
+
+
+def classify_page(text: str) -> str:
+    """Route for one page: "text" (usable text layer), "image" (little or no text) or "garbage" (unreadable)."""
+    stripped = text.strip()
+    if len(stripped) < MIN_TEXT_CHARS:
+        return "image"
+
+    # Unmapped glyphs from fonts without a ToUnicode table come out as "(cid:123)" or U+FFFD
+    cid_chars = sum(len(match) for match in CID_PATTERN.findall(stripped))
+    if cid_chars > len(stripped) * 0.2 or stripped.count("\ufffd") > len(stripped) * 0.05:
+        return "garbage"
+
+    visible = [c for c in stripped if not c.isspace()]
+    # Combining marks count as letters so Devanagari matras do not make Hindi text look like garbage;
+    # digits and punctuation count too, so number-heavy pages (fee tables, schedules) keep their text layer
+    readable = sum(1 for c in visible if c.isalnum() or c in COMMON_PUNCTUATION
+                   or unicodedata.category(c).startswith("M"))
+    if readable < len(visible) * MIN_LETTER_RATIO:
+        return "garbage"
+    return "text"
+
+
+def route_pages(pdf_path: str, source: Optional[str] = None,
+                progress: Optional[Callable[[int, int], None]] = None) -> Tuple[List[Document], Dict[str, int]]:
+    """
+    Extract a PDF page by page: pages with a usable text layer keep it, image-only and garbage pages
+    are OCR'd. Returns one Document per non-empty page, in page order, and the route counts.
+    """
+    from utils.ocr import ocr_pdf_pages, page_count
+    from utils.pdf_extraction import load_pdf
+
+    source = source or pdf_path
+    pages: Dict[int, Document] = {}
+    try:
+        for doc in load_pdf(pdf_path):
+            pages[doc.metadata.get("page", len(pages))] = doc
+        total = max(pages) + 1 if pages else 0
+    except Exception as e:
+        print(f"⚠️ Text layer extraction failed, sending every page to OCR: {e}")
+        try:
+            total = page_count(pdf_path)
+        except Exception as e:
+            # Unreadable locally; callers fall back to Gemini OCR on an empty result
+            print(f"❌ Could not open PDF for OCR: {e}")
+            return [], {"text": 0, "image": 0, "garbage": 0}
+
+    routes = {page: classify_page(pages[page].page_content) if page in pages else "image" for page in range(total)}
+    counts = {route: sum(1 for r in routes.values() if r == route) for route in ("text", "image", "garbage")}
+    print(f"📄 Page routing for {os.path.basename(source)}: {counts}")
+
+    merged: Dict[int, Document] = {}
+    for page, route in routes.items():
+        if route == "text":
+            merged[page] = Document(page_content=pages[page].page_content,
+                                    metadata={**pages[page].metadata, "source": source, "page": page,
+                                              "extraction": "text"})
+
+    ocr_pages = [page + 1 for page, route in routes.items() if route != "text"]
+    if ocr_pages:
+        try:
+            for page_number, text in ocr_pdf_pages(pdf_path, pages=ocr_pages, progress=progress):
+                page = page_number - 1
+                if text:
+                    merged[page] = Document(page_content=text,
+                                            metadata={"source": source, "page": page, "extraction": "ocr"})
+                elif routes[page] == "garbage":
+                    # OCR found nothing; a garbled text layer is still better than dropping the page
+                    merged[page] = Document(page_content=pages[page].page_content,
+                                            metadata={"source": source, "page": page, "extraction": "text"})
+        except Exception as e:
+            print(f"❌ OCR process failed: {e}")
+
+    docs = [merged[page] for page in sorted(merged) if merged[page].page_content.strip()]
+    return docs, counts
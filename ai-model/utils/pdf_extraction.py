@@ -0,0 +1,105 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+from langchain.schema import Document
+
+# "pymupdf" (default) or "pypdf"; falls back to pypdf when PyMuPDF is not installed
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pymupdf")
+# Attach per-block bounding boxes to each page's metadata (for highlighting answers in the source PDF)
+PDF_INCLUDE_BLOCKS = os.getenv("PDF_INCLUDE_BLOCKS", "0") == "1"
+
+
+class PDFBackend(ABC):
+    """Extracts the text layer of a PDF as one Document per page with 0-based "page" metadata."""
+
+    name = "base"
+
+    @abstractmethod
+    def extract_pages(self, path: str, source: Optional[str] = None, include_blocks: bool = False) -> List[Document]:
+        ...
+
+
+class PyMuPDFBackend(PDFBackend):
+    name = "pymupdf"
+
+    def __init__(self):
+        import fitz  # PyMuPDF; imported here so a missing install only disables this backend
+        self.fitz = fitz
+
+    def extract_pages(self, path: str, source: Optional[str] = None, include_blocks: bool = False) -> List[Document]:
+        docs = []
+        with self.fitz.open(path) as pdf:
+            for page in pdf:
+                metadata = {"source": source or path, "page": page.number, "total_pages": pdf.page_count}
+                if include_blocks:
+                    # (x0, y0, x1, y1, text, block_no, block_type); type 0 is text, 1 is image
+                    parts, blocks, offset = [], [], 0
+                    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks", sort=True):
+                        if block_type != 0 or not text.strip():
+                            continue
+                        text = text.strip()
+                        blocks.append({"bbox": [round(x0, 1), round(y0, 1), round(x1, 1), round(y1, 1)],
+                                       "start": offset, "end": offset + len(text)})
+                        parts.append(text)
+                        offset += len(text) + 1
+                    content = "\n".join(parts)
+                    metadata["blocks"] = blocks
+                else:
+                    content = page.get_text("text")
+                docs.append(Document(page_content=content, metadata=metadata))
+        return docs
+
+
+class PyPDFBackend(PDFBackend):
+    name = "pypdf"
+
+    def extract_pages(self, path: str, source: Optional[str] = None, include_blocks: bool = False) -> List[Document]:
+        from langchain_community.document_loaders import PyPDFLoader
+
+        docs = PyPDFLoader(path).load()
+        for doc in docs:
+            doc.metadata["source"] = source or path
+            doc.metadata["total_pages"] = len(docs)
+        return docs
+
+
+def blocks_in_span(blocks: List[dict], start: int, end: int) -> List[dict]:
+    """Page blocks overlapping page_content[start:end], with offsets rebased to (and clipped at) that span."""
+    return [
+        {**block, "start": max(block["start"], start) - start, "end": min(block["end"], end) - start}
+        for block in blocks
+        if block["start"] < end and block["end"] > start
+    ]
+
+
+BACKENDS: Dict[str, Type[PDFBackend]] = {
+    PyMuPDFBackend.name: PyMuPDFBackend,
+    PyPDFBackend.name: PyPDFBackend,
+}
+_instances: Dict[str, PDFBackend] = {}
+
+
+def register_backend(backend: Type[PDFBackend]):
+    BACKENDS[backend.name] = backend
+
+
+def get_backend(name: Optional[str] = None) -> PDFBackend:
+    name = name or PDF_BACKEND
+    if name not in _instances:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend: {name}")
+        try:
+            _instances[name] = BACKENDS[name]()
+        except ImportError as e:
+            if name == PyPDFBackend.name:
+                raise
+            print(f"⚠️ PDF backend {name} unavailable ({e}), using pypdf")
+            _instances[name] = get_backend(PyPDFBackend.name)
+    return _instances[name]
+
+
+def load_pdf(path: str, source: Optional[str] = None, backend: Optional[str] = None,
+             include_blocks: Optional[bool] = None) -> List[Document]:
+    """Per-page Documents for a PDF's text layer using the configured backend."""
+    include_blocks = PDF_INCLUDE_BLOCKS if include_blocks is None else include_blocks
+    return get_backend(backend).extract_pages(path, source=source, include_blocks=include_blocks)
@@ -1,6 +1,6 @@
 import os
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFLoader
+from utils.pdf_extraction import load_pdf
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
@@ -27,8 +27,7 @@ class QueryAgent:
 
     def _create_vectorstore(self):
         """Loads PDF, splits text, and stores it in FAISS."""
-        loader = PyPDFLoader(self.pdf_path)
-        documents = loader.load()
+        documents = load_pdf(self.pdf_path)
 
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
         texts = text_splitter.split_documents(documents)
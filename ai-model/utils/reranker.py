@@ -0,0 +1,54 @@
+import time
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class CrossEncoderReranker:
+    """Re-scores retrieved chunks with a small local cross-encoder, within a per-request time budget."""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", top_n: int = 4,
+                 batch_size: int = 16, budget_ms: float = 250):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.model = None
+        self.disabled = False
+
+    def load(self):
+        if self.model is not None or self.disabled:
+            return self.model
+        try:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(self.model_name, device="cpu")
+            print(f"✅ Cross-encoder re-ranker loaded: {self.model_name}")
+        except Exception as e:
+            print(f"⚠️ Cross-encoder unavailable, skipping re-ranking: {e}")
+            self.disabled = True
+        return self.model
+
+    def rerank(self, query: str, items: Sequence[T], text_of: Callable[[T], str],
+               top_n: Optional[int] = None) -> List[T]:
+        """
+        Return the best top_n items. Candidates are scored in batches; once the budget is spent the
+        remaining ones keep their retrieval order behind the scored ones.
+        """
+        top_n = top_n or self.top_n
+        items = list(items)
+        model = self.load()
+        if model is None or len(items) <= 1:
+            return items[:top_n]
+
+        started = time.perf_counter()
+        scores: List[float] = []
+        for start in range(0, len(items), self.batch_size):
+            if scores and (time.perf_counter() - started) * 1000 > self.budget_ms:
+                break
+            batch = items[start:start + self.batch_size]
+            scores.extend(float(s) for s in model.predict([(query, text_of(item)) for item in batch],
+                                                          batch_size=len(batch)))
+
+        scored = sorted(zip(scores, range(len(scores))), key=lambda pair: pair[0], reverse=True)
+        ranked = [items[i] for _, i in scored] + items[len(scores):]
+        return ranked[:top_n]
@@ -0,0 +1,155 @@
+import re
+import json
+import time
+from typing import AsyncIterator, Callable, List, Optional
+from fastapi.responses import StreamingResponse
+from utils.concurrency import llm_slot
+
+# "### Heading" (not part of "####") or "5. ### Heading", anywhere in a line
+HEADING_MARK = re.compile(r"(?:(\d+)\.[ \t]*###[ \t]*|(?<!#)###[ \t]+)")
+REPEATED_HEADING = re.compile(r"(###[ \t]+){2,}")
+BULLET = re.compile(r"^[*+•][ \t]+")
+NUMBER_SPACING = re.compile(r"(\d+)\.(?=[^\s])")
+
+
+class MarkdownStreamCleaner:
+    """
+    Line-buffered Markdown normalizer for model output. Text can be fed in arbitrary chunks; each
+    line is emitted once complete, so a streamed answer is identical to cleaning the whole text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._started = False
+        self._blank_pending = False
+        self._parts: List[str] = []
+
+    @classmethod
+    def clean(cls, text: str) -> str:
+        cleaner = cls()
+        cleaner.feed(text)
+        cleaner.finish()
+        return cleaner.text
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def _split_headings(self, line: str) -> List[str]:
+        """Put every heading on its own line, preceded by a blank line."""
+        line = REPEATED_HEADING.sub("### ", line)
+        lines, current, position = [], "", 0
+        for match in HEADING_MARK.finditer(line):
+            current += line[position:match.start()]
+            if current.strip():
+                lines.append(current.rstrip())
+            current = f"{match.group(1)}. ### " if match.group(1) else "### "
+            position = match.end()
+        lines.append(current + line[position:])
+        return lines
+
+    def _emit(self, line: str) -> str:
+        if not line.strip():
+            self._blank_pending = self._started
+            return ""
+        if not self._started:
+            line = line.lstrip()
+        line = NUMBER_SPACING.sub(r"\1. ", BULLET.sub("- ", line))
+
+        if HEADING_MARK.match(line.lstrip()) and self._started:
+            self._blank_pending = True
+        separator = ("\n\n" if self._blank_pending else "\n") if self._started else ""
+        self._started = True
+        self._blank_pending = False
+        return separator + line
+
+    def _process(self, line: str) -> str:
+        out = "".join(self._emit(part) for part in self._split_headings(line.rstrip(" \t\r")))
+        self._parts.append(out)
+        return out
+
+    def feed(self, chunk: str) -> str:
+        """Add model output; returns the cleaned text for every line completed by this chunk."""
+        self._buffer += chunk
+        out = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            out.append(self._process(line))
+        return "".join(out)
+
+    def finish(self) -> str:
+        """Flush the last, unterminated line."""
+        line, self._buffer = self._buffer, ""
+        return self._process(line) if line else ""
+
+
+def sse_event(data, event: Optional[str] = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    # Disable proxy buffering so each event reaches the client as soon as it is produced
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def stream_llm_answer(llm, prompt, done: Optional[dict] = None,
+                            on_complete: Optional[Callable[[str, float], None]] = None) -> AsyncIterator[str]:
+    """
+    Stream a model answer as server-sent events: "data" events carry cleaned text deltas, a final
+    "done" event carries the endpoint's metadata plus time-to-first-token.
+    """
+    cleaner = MarkdownStreamCleaner()
+    started = time.perf_counter()
+    first_token = None
+    try:
+        async with llm_slot(llm):
+            async for chunk in llm.astream(prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                delta = cleaner.feed(text)
+                if delta:
+                    first_token = first_token or time.perf_counter()
+                    yield sse_event({"delta": delta})
+        delta = cleaner.finish()
+        if delta:
+            first_token = first_token or time.perf_counter()
+            yield sse_event({"delta": delta})
+    except Exception as e:
+        print(f"❌ Streaming failed: {e}")
+        yield sse_event({"error": f"Failed to generate answer: {str(e)}"}, event="error")
+        return
+
+    latency = time.perf_counter() - started
+    if on_complete is not None:
+        on_complete(cleaner.text, latency)
+    yield sse_event({
+        **(done or {}),
+        "ttft_ms": round(((first_token or time.perf_counter()) - started) * 1000, 1),
+        "total_ms": round(latency * 1000, 1),
+    }, event="done")
+
+
+async def stream_retrieval_qa(chain, query: str, done: Optional[dict] = None) -> AsyncIterator[str]:
+    """Stream a RetrievalQA answer: retrieve, fill the chain's own "stuff" prompt, then stream the model."""
+    try:
+        docs = await chain.retriever.ainvoke(query)
+        combine = chain.combine_documents_chain
+        prompt = combine.llm_chain.prompt.format_prompt(**combine._get_inputs(docs, question=query))
+    except Exception as e:
+        print(f"❌ Retrieval failed: {e}")
+        yield sse_event({"error": f"Failed to retrieve context: {str(e)}"}, event="error")
+        return
+
+    async for event in stream_llm_answer(combine.llm_chain.llm, prompt, done=done):
+        yield event
+
+
+async def stream_text(text: str, done: Optional[dict] = None) -> AsyncIterator[str]:
+    """Replay an already available answer (e.g. a cache hit) in the same event format."""
+    yield sse_event({"delta": text})
+    yield sse_event({**(done or {}), "ttft_ms": 0.0, "total_ms": 0.0}, event="done")
+
+
+async def stream_error(message: str) -> AsyncIterator[str]:
+    yield sse_event({"error": message}, event="error")
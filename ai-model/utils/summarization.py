@@ -1,5 +1,5 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import llm_clients
 
 API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -7,7 +7,7 @@ class SummarizationAgent:
     """Summarizes legal information retrieved from PDFs."""
     
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(api_key=API_KEY, model="gemini-2.5-pro", temperature=0.3)
+        self.llm = llm_clients.get("gemini-2.5-pro", API_KEY, temperature=0.3)
 
     def summarize(self, text):
         """Simplifies legal content into user-friendly answers."""
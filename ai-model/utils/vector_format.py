@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import mmap
+import argparse
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+import faiss
+from langchain.schema import Document
+from langchain.vectorstores.base import VectorStore
+from utils.vector_index import (
+    FULL_VECTORS_FILE, apply_search_params, exact_l2, load_faiss_vectorstore, load_index_config, store_vectors,
+)
+
+# Pickle-free, memory-mapped store layout:
+#   manifest.json         format tag, row count, dim and index config
+#   vectors.npy           float32 vectors, opened with mmap
+#   index.faiss           only for IVF / HNSW / quantized stores, opened with IO_FLAG_MMAP
+#   texts.bin + texts.idx.npy        chunk texts (utf-8) and their byte offsets
+#   metadata.bin + metadata.idx.npy  per-chunk metadata (JSON) and their byte offsets
+MANIFEST_FILE = "manifest.json"
+FORMAT_NAME = "mmap-v1"
+SEARCH_BLOCK_ROWS = 65536
+
+
+def is_mmap_store(path: str) -> bool:
+    return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(path: str) -> dict:
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(path: str, manifest: dict):
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _write_column(path: str, name: str, values: Iterable[bytes]):
+    offsets = [0]
+    with open(os.path.join(path, f"{name}.bin"), "wb") as f:
+        for value in values:
+            f.write(value)
+            offsets.append(offsets[-1] + len(value))
+    np.save(os.path.join(path, f"{name}.idx.npy"), np.asarray(offsets, dtype=np.int64))
+
+
+class _Column:
+    """Offset-indexed byte column read lazily through mmap."""
+
+    def __init__(self, path: str, name: str):
+        self.offsets = np.load(os.path.join(path, f"{name}.idx.npy"), mmap_mode="r")
+        self._file = open(os.path.join(path, f"{name}.bin"), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._data[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+
+def write_mmap_store(path: str, vectors: np.ndarray, docs: List[Document], config: dict,
+                     index: Optional[faiss.Index] = None):
+    """Write vectors, texts and metadata in the mmap layout."""
+    os.makedirs(path, exist_ok=True)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    np.save(os.path.join(path, FULL_VECTORS_FILE), vectors)
+    _write_column(path, "texts", (doc.page_content.encode("utf-8") for doc in docs))
+    _write_column(path, "metadata", (json.dumps(doc.metadata, default=str).encode("utf-8") for doc in docs))
+
+    # A flat float32 index is just the vectors file, so only other index types are written out
+    needs_index = config.get("index_type", "flat") != "flat" or config.get("storage", "float32") != "float32"
+    if needs_index and index is not None:
+        faiss.write_index(index, os.path.join(path, "index.faiss"))
+
+    write_manifest(path, {
+        "format": FORMAT_NAME,
+        "count": len(docs),
+        "dim": int(vectors.shape[1]) if len(vectors) else 0,
+        "index": config,
+        "has_index": bool(needs_index and index is not None),
+    })
+
+
+def _ordered_documents(vs) -> List[Document]:
+    return [vs.docstore.search(vs.index_to_docstore_id[i]) for i in range(vs.index.ntotal)]
+
+
+def save_faiss_as_mmap(vs, path: str):
+    """Write an in-memory LangChain FAISS store in the mmap layout."""
+    config = getattr(vs, "index_config", {"index_type": "flat", "storage": "float32", "params": {}})
+    write_mmap_store(path, store_vectors(vs), _ordered_documents(vs), config, vs.index)
+
+
+class MmapVectorStore(VectorStore):
+    """Read-only vectorstore backed by memory-mapped vectors; chunk texts are fetched only for hits."""
+
+    rerank_factor = int(os.getenv("VECTORSTORE_RERANK_FACTOR", "4"))
+
+    def __init__(self, path: str, embedding):
+        self.path = path
+        self.embedding = embedding
+        self.manifest = read_manifest(path)
+        self.index_config = self.manifest.get("index", {})
+        self.full_vectors = np.load(os.path.join(path, FULL_VECTORS_FILE), mmap_mode="r")
+        self._texts = _Column(path, "texts")
+        self._metadata = _Column(path, "metadata")
+
+        self.index = None
+        if self.manifest.get("has_index"):
+            index_path = os.path.join(path, "index.faiss")
+            try:
+                self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                self.index = faiss.read_index(index_path)
+            apply_search_params(self.index, self.index_config)
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def get_document(self, i: int) -> Document:
+        return Document(
+            page_content=self._texts[i].decode("utf-8"),
+            metadata=json.loads(self._metadata[i].decode("utf-8")),
+        )
+
+    def _flat_search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact search over the mmap'd vectors in blocks, so only the page cache holds them."""
+        best_ids, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, len(self), SEARCH_BLOCK_ROWS):
+            block = self.full_vectors[start:start + SEARCH_BLOCK_ROWS]
+            scores = exact_l2(query, block)
+            ids = np.arange(start, start + len(block))
+            best_ids = np.concatenate([best_ids, ids])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_ids) > k:
+                keep = np.argpartition(best_scores, k)[:k]
+                best_ids, best_scores = best_ids[keep], best_scores[keep]
+        order = np.argsort(best_scores)
+        return best_ids[order], best_scores[order]
+
+    def search_ids(self, embedding: List[float], k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, squared L2 scores) of the top-k rows."""
+        query = np.asarray([embedding], dtype=np.float32)
+        k = min(k, len(self))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if self.index is None:
+            return self._flat_search(query, k)
+
+        # ANN / quantized index: over-fetch, then re-rank against the exact vectors
+        _, ids = self.index.search(query, min(len(self), k * max(1, self.rerank_factor)))
+        candidates = np.sort(ids[0][ids[0] != -1])
+        scores = exact_l2(query, self.full_vectors[candidates])
+        order = np.argsort(scores)[:k]
+        return candidates[order], scores[order]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any):
+        ids, scores = self.search_ids(embedding, k)
+        return [(self.get_document(int(i)), float(s)) for i, s in zip(ids, scores)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise TypeError("MmapVectorStore is read-only; rebuild the store to add documents.")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        raise TypeError("Build a FAISS store and save it with save_faiss_as_mmap instead.")
+
+
+def convert_legacy_store(path: str, remove_legacy: bool = False):
+    """Convert an index.faiss + index.pkl directory to the mmap layout."""
+    vs = load_faiss_vectorstore(path, None)
+    config = load_index_config(path)
+    write_mmap_store(path, store_vectors(vs), _ordered_documents(vs), config, vs.index)
+
+    if remove_legacy:
+        os.unlink(os.path.join(path, "index.pkl"))
+        if not read_manifest(path)["has_index"]:
+            os.unlink(os.path.join(path, "index.faiss"))
+    print(f"✅ Converted {path} ({vs.index.ntotal} chunks) to {FORMAT_NAME}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert pickled FAISS vectorstores to the mmap format.")
+    parser.add_argument("command", choices=["convert"])
+    parser.add_argument("paths", nargs="+", help="Vectorstore directories, e.g. hf_vectorstores/*")
+    parser.add_argument("--remove-legacy", action="store_true", help="Delete index.pkl (and flat index.faiss) afterwards")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        if is_mmap_store(path):
+            print(f"ℹ️ {path} is already in {FORMAT_NAME} format")
+        elif os.path.exists(os.path.join(path, "index.pkl")):
+            convert_legacy_store(path, args.remove_legacy)
+        else:
+            print(f"⚠️ Skipping {path}: not a vectorstore directory")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
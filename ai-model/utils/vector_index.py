@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import uuid
+import math
+import shutil
+import argparse
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+INDEX_CONFIG_FILE = "index_config.json"
+FULL_VECTORS_FILE = "vectors.npy"
+
+# Build and search parameters per index type; None means "derive from corpus size"
+DEFAULT_INDEX_PARAMS = {
+    "flat": {},
+    "ivf": {"nlist": None, "nprobe": 8},
+    "hnsw": {"M": 32, "efConstruction": 80, "efSearch": 64},
+}
+
+# How vectors are stored inside the index; anything but float32 keeps full vectors on disk for re-ranking
+STORAGE_TYPES = ("float32", "fp16", "sq8", "pq")
+PQ_SUBQUANTIZERS = 48  # 384 dims -> 8 dims per sub-vector, 48 bytes per vector
+PQ_MIN_TRAINING = 256  # 2^8 centroids per sub-quantizer
+
+
+def _auto_nlist(count: int) -> int:
+    # Roughly 4 * sqrt(n) lists, while keeping ~39 training points per centroid as FAISS recommends
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def _scalar_type(storage: str):
+    return faiss.ScalarQuantizer.QT_fp16 if storage == "fp16" else faiss.ScalarQuantizer.QT_8bit
+
+
+def _create_index(index_type: str, storage: str, dim: int, params: Dict) -> faiss.Index:
+    if index_type == "ivf":
+        quantizer = faiss.IndexFlatL2(dim)
+        if storage == "pq":
+            return faiss.IndexIVFPQ(quantizer, dim, params["nlist"], PQ_SUBQUANTIZERS, 8)
+        if storage in ("fp16", "sq8"):
+            return faiss.IndexIVFScalarQuantizer(quantizer, dim, params["nlist"], _scalar_type(storage))
+        return faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+
+    if index_type == "hnsw":
+        if storage == "pq":
+            index = faiss.IndexHNSWPQ(dim, PQ_SUBQUANTIZERS, params["M"])
+        elif storage in ("fp16", "sq8"):
+            index = faiss.IndexHNSWSQ(dim, _scalar_type(storage), params["M"])
+        else:
+            index = faiss.IndexHNSWFlat(dim, params["M"])
+        index.hnsw.efConstruction = params["efConstruction"]
+        return index
+
+    if storage == "pq":
+        return faiss.IndexPQ(dim, PQ_SUBQUANTIZERS, 8)
+    if storage in ("fp16", "sq8"):
+        return faiss.IndexScalarQuantizer(dim, _scalar_type(storage))
+    return faiss.IndexFlatL2(dim)
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", params: Optional[Dict] = None,
+                storage: str = "float32") -> Tuple[faiss.Index, Dict]:
+    """Build a FAISS index of the requested type and storage and return it with its resolved config."""
+    index_type = (index_type or "flat").lower()
+    storage = (storage or "float32").lower()
+    if index_type not in DEFAULT_INDEX_PARAMS:
+        raise ValueError(f"Unknown index type: {index_type}")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    resolved = {**DEFAULT_INDEX_PARAMS[index_type], **(params or {})}
+
+    if index_type == "ivf":
+        resolved["nlist"] = resolved["nlist"] or _auto_nlist(count)
+        if count < 39 * resolved["nlist"] or resolved["nlist"] < 2:
+            print(f"⚠️ Only {count} vectors — too few to train IVF, falling back to flat index.")
+            return build_index(vectors, "flat", storage=storage)
+
+    if storage == "pq" and (count < PQ_MIN_TRAINING or dim % PQ_SUBQUANTIZERS):
+        print(f"⚠️ Cannot train PQ on {count} vectors of dim {dim}, falling back to sq8 storage.")
+        storage = "sq8"
+
+    index = _create_index(index_type, storage, dim, resolved)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+
+    config = {"index_type": index_type, "storage": storage, "params": resolved, "dim": dim, "count": count}
+    apply_search_params(index, config)
+    return index, config
+
+
+def apply_search_params(index: faiss.Index, config: Dict):
+    """Apply query-time parameters (nprobe / efSearch) that are not stored in index.faiss."""
+    params = config.get("params", {})
+    if config.get("index_type") == "ivf":
+        faiss.extract_index_ivf(index).nprobe = params.get("nprobe", 8)
+    elif config.get("index_type") == "hnsw":
+        index.hnsw.efSearch = params.get("efSearch", 64)
+
+
+def get_vectors(index: faiss.Index) -> np.ndarray:
+    """Return all vectors held by an index (IVF indexes need a direct map first)."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.make_direct_map()
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal).astype(np.float32)
+
+
+def store_vectors(vs) -> np.ndarray:
+    """Full-precision vectors of a store, preferring the on-disk copy kept for quantized indexes."""
+    full_vectors = getattr(vs, "full_vectors", None)
+    return np.asarray(full_vectors, dtype=np.float32) if full_vectors is not None else get_vectors(vs.index)
+
+
+def store_size(vs) -> int:
+    full_vectors = getattr(vs, "full_vectors", None)
+    return len(full_vectors) if full_vectors is not None else vs.index.ntotal
+
+
+def store_document(vs, position: int):
+    """Document at a vector row, for both FAISS stores and the lazy mmap stores."""
+    if hasattr(vs, "get_document"):
+        return vs.get_document(position)
+    return vs.docstore.search(vs.index_to_docstore_id[position])
+
+
+def row_vectors(vs, ids: np.ndarray) -> np.ndarray:
+    """Full-precision vectors for selected rows of a store (in the order given)."""
+    full_vectors = getattr(vs, "full_vectors", None)
+    if full_vectors is not None:
+        return np.asarray(full_vectors[np.asarray(ids, dtype=np.int64)], dtype=np.float32)
+    return np.vstack([vs.index.reconstruct(int(i)) for i in ids]).astype(np.float32)
+
+
+def exact_l2(query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Squared L2 distances, the same score FAISS reports for flat L2 indexes."""
+    diff = np.asarray(vectors, dtype=np.float32) - query
+    return np.einsum("ij,ij->i", diff, diff)
+
+
+def save_index_config(path: str, config: Dict):
+    with open(os.path.join(path, INDEX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_index_config(path: str) -> Dict:
+    config_path = os.path.join(path, INDEX_CONFIG_FILE)
+    if not os.path.exists(config_path):
+        return {"index_type": "flat", "storage": "float32", "params": {}}
+    with open(config_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class QuantizedFAISS(FAISS):
+    """FAISS store that re-ranks over-fetched candidates against full-precision vectors kept on disk."""
+
+    full_vectors = None
+    rerank_factor = int(os.getenv("VECTORSTORE_RERANK_FACTOR", "4"))
+
+    def search_ids(self, embedding, k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, squared L2 scores) of the top-k rows, re-ranked when full vectors exist."""
+        query = np.asarray([embedding], dtype=np.float32)
+        rerank = self.full_vectors is not None and self.rerank_factor > 1
+        fetch_k = min(self.index.ntotal, k * self.rerank_factor if rerank else k)
+        if fetch_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores, ids = self.index.search(query, fetch_k)
+        valid = ids[0] != -1
+        if not rerank:
+            return ids[0][valid], scores[0][valid]
+
+        candidates = np.sort(ids[0][valid])
+        distances = exact_l2(query, self.full_vectors[candidates])
+        order = np.argsort(distances)[:k]
+        return candidates[order], distances[order]
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs):
+        if self.full_vectors is None or self.rerank_factor <= 1 or filter is not None or kwargs.get("score_threshold"):
+            return super().similarity_search_with_score_by_vector(embedding, k, filter=filter, fetch_k=fetch_k, **kwargs)
+
+        ids, distances = self.search_ids(embedding, k)
+        return [
+            (self.docstore.search(self.index_to_docstore_id[int(i)]), float(d))
+            for i, d in zip(ids, distances)
+        ]
+
+
+def build_vectorstore(chunks, embeddings, index_type: str = "flat", params: Optional[Dict] = None,
+                      storage: str = "float32") -> QuantizedFAISS:
+    """Embed chunks and wrap an index of the requested type in a LangChain FAISS store."""
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    index, config = build_index(vectors, index_type, params, storage)
+
+    ids = [str(uuid.uuid4()) for _ in chunks]
+    vs = QuantizedFAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    vs.index_config = config
+    if config["storage"] != "float32":
+        vs.full_vectors = vectors
+    return vs
+
+
+@contextmanager
+def atomic_directory(path: str):
+    """
+    Yield a temporary sibling directory and rename it to path once fully written, so readers never see a
+    half-written directory. A new path appears atomically; replacing an existing one takes two renames,
+    and a reader landing between them finds path missing (treated like a store not built yet).
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.tmp-", dir=parent)
+    try:
+        yield tmp_path
+        if os.path.exists(path):
+            # Directories cannot be replaced in one rename: move the old one aside first
+            old_path = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.old-", dir=parent)
+            os.rename(path, os.path.join(old_path, "store"))
+            os.rename(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+                # A concurrent writer finished first; its store is equivalent, keep it
+                shutil.rmtree(tmp_path, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def save_vectorstore(vs: FAISS, path: str, fmt: str = "mmap"):
+    """Persist a freshly built store, as the pickle-free mmap layout or as legacy index.faiss + index.pkl."""
+    if fmt == "mmap":
+        from utils.vector_format import save_faiss_as_mmap
+        save_faiss_as_mmap(vs, path)
+        return
+
+    vs.save_local(path)
+    config = getattr(vs, "index_config", {"index_type": "flat", "storage": "float32", "params": {}})
+    save_index_config(path, config)
+    if getattr(vs, "full_vectors", None) is not None:
+        vectors_path = os.path.join(path, FULL_VECTORS_FILE)
+        np.save(vectors_path, np.asarray(vs.full_vectors, dtype=np.float32))
+        # Keep only the page-cached on-disk copy resident from here on
+        vs.full_vectors = np.load(vectors_path, mmap_mode="r")
+
+
+def load_faiss_vectorstore(path: str, embeddings) -> QuantizedFAISS:
+    """Load a legacy index.faiss + index.pkl store and restore its search params."""
+    vs = QuantizedFAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    config = load_index_config(path)
+    apply_search_params(vs.index, config)
+    vs.index_config = config
+
+    vectors_path = os.path.join(path, FULL_VECTORS_FILE)
+    if config.get("storage", "float32") != "float32" and os.path.exists(vectors_path):
+        vs.full_vectors = np.load(vectors_path, mmap_mode="r")
+    return vs
+
+
+def load_vectorstore(path: str, embeddings):
+    """Load a store in whichever on-disk format it was saved."""
+    from utils.vector_format import MmapVectorStore, is_mmap_store
+
+    if is_mmap_store(path):
+        return MmapVectorStore(path, embeddings)
+    return load_faiss_vectorstore(path, embeddings)
+
+
+def migrate_store(path: str, storage: str, index_type: Optional[str] = None):
+    """Rewrite the index of an existing store with a new storage (and optionally index) type."""
+    from utils.vector_format import is_mmap_store, read_manifest, write_manifest
+
+    mmap_format = is_mmap_store(path)
+    config = read_manifest(path)["index"] if mmap_format else load_index_config(path)
+    vectors_path = os.path.join(path, FULL_VECTORS_FILE)
+    if os.path.exists(vectors_path):
+        vectors = np.load(vectors_path)
+    else:
+        vectors = get_vectors(faiss.read_index(os.path.join(path, "index.faiss")))
+
+    index_type = index_type or config.get("index_type", "flat")
+    params = config.get("params") if index_type == config.get("index_type") else None
+    index, new_config = build_index(vectors, index_type, params, storage)
+    needs_index = not (mmap_format and index_type == "flat" and new_config["storage"] == "float32")
+
+    # Write next to the original first so an interrupted migration never leaves a broken store
+    if needs_index:
+        tmp_index = os.path.join(path, "index.faiss.tmp")
+        faiss.write_index(index, tmp_index)
+        os.replace(tmp_index, os.path.join(path, "index.faiss"))
+    elif os.path.exists(os.path.join(path, "index.faiss")):
+        os.unlink(os.path.join(path, "index.faiss"))
+
+    if mmap_format:
+        manifest = read_manifest(path)
+        manifest.update({"index": new_config, "has_index": needs_index})
+        write_manifest(path, manifest)
+    else:
+        if new_config["storage"] != "float32":
+            np.save(vectors_path, vectors)
+        elif os.path.exists(vectors_path):
+            os.unlink(vectors_path)
+        save_index_config(path, new_config)
+
+    old_size = vectors.nbytes
+    new_size = faiss.serialize_index(index).nbytes if needs_index else 0
+    print(f"✅ {path}: {config.get('storage', 'float32')} -> {new_config['storage']} "
+          f"({old_size / 1e6:.2f} MB -> {new_size / 1e6:.2f} MB resident)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate vectorstore directories to a quantized storage mode.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("paths", nargs="+", help="Vectorstore directories, e.g. hf_vectorstores/*")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, required=True)
+    parser.add_argument("--index-type", choices=list(DEFAULT_INDEX_PARAMS))
+    args = parser.parse_args(argv)
+    from utils.vector_format import is_mmap_store
+
+    for path in args.paths:
+        # Flat float32 stores in the mmap layout have no index.faiss but migrate all the same
+        if not (is_mmap_store(path) or os.path.exists(os.path.join(path, "index.faiss"))):
+            print(f"⚠️ Skipping {path}: not a vectorstore")
+            continue
+        migrate_store(path, args.storage, args.index_type)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
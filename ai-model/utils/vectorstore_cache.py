@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import numpy as np
+from utils.single_flight import SingleFlight
+
+DOC_OVERHEAD_BYTES = 200  # Document object, metadata dict and docstore id per chunk
+
+
+def _index_bytes(index) -> int:
+    if index is None or index.ntotal == 0:
+        return 0
+    try:
+        code_size = index.sa_code_size()
+    except RuntimeError:
+        code_size = index.d * 4
+    total = code_size * index.ntotal
+    if hasattr(index, "hnsw"):
+        total += index.ntotal * index.hnsw.nb_neighbors(0) * 4
+    return total
+
+
+def estimate_store_bytes(vs) -> int:
+    """Approximate private (non page-cache) memory held by a vectorstore."""
+    # Indexes opened with IO_FLAG_MMAP mostly live in the page cache, but are counted conservatively
+    total = _index_bytes(getattr(vs, "index", None))
+
+    docstore = getattr(vs, "docstore", None)
+    if docstore is not None and hasattr(docstore, "_dict"):
+        for doc in docstore._dict.values():
+            total += len(doc.page_content.encode("utf-8")) + DOC_OVERHEAD_BYTES
+    elif hasattr(vs, "manifest"):
+        # Lazily decoded texts: only the offset arrays are resident
+        total += 2 * 8 * (vs.manifest.get("count", 0) + 1)
+
+    full_vectors = getattr(vs, "full_vectors", None)
+    if full_vectors is not None and not isinstance(full_vectors, np.memmap):
+        total += full_vectors.nbytes
+
+    lexical = getattr(vs, "lexical_index", None)
+    if lexical is not None:
+        total += sum(arr.nbytes for arr in (lexical.offsets, lexical.doc_ids, lexical.tfs, lexical.doc_lengths))
+        total += len(lexical.vocab) * 64
+    return total
+
+
+class VectorStoreCache:
+    """Byte-budgeted LRU/LFU cache of vectorstores that reloads evicted stores on demand."""
+
+    def __init__(self, loader: Callable[[str], Optional[object]], max_bytes: int, policy: str = "lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._stores: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._uses: Dict[str, int] = {}
+        self._pinned = set()
+        self._lock = threading.RLock()
+        # Concurrent cold loads of one key share a single loader call
+        self._loads = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._stores
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def get(self, key: str):
+        """Return a resident store, or load it through the loader (None if it does not exist)."""
+        with self._lock:
+            if key in self._stores:
+                self.hits += 1
+                self._uses[key] += 1
+                self._stores.move_to_end(key)
+                return self._stores[key]
+            self.misses += 1
+
+        return self._loads.do(key, self._load, key)
+
+    def _load(self, key: str):
+        with self._lock:
+            # Another caller's load may have finished between our miss and taking the flight
+            if key in self._stores:
+                return self._stores[key]
+        vs = self.loader(key)
+        if vs is not None:
+            with self._lock:
+                self.reloads += 1
+                self.put(key, vs)
+        return vs
+
+    def put(self, key: str, vs, pinned: bool = False):
+        with self._lock:
+            self._stores[key] = vs
+            self._stores.move_to_end(key)
+            self._sizes[key] = estimate_store_bytes(vs)
+            self._uses.setdefault(key, 1)
+            if pinned:
+                self._pinned.add(key)
+            self._evict(keep=key)
+
+    def pin(self, key: str):
+        with self._lock:
+            self._pinned.add(key)
+
+    def _evict(self, keep: str):
+        while self.resident_bytes > self.max_bytes:
+            candidates = [k for k in self._stores if k not in self._pinned and k != keep]
+            if not candidates:
+                return
+            if self.policy == "lfu":
+                victim = min(candidates, key=lambda k: self._uses[k])
+            else:
+                victim = candidates[0]  # OrderedDict keeps least recently used first
+            print(f"♻️ Evicting vectorstore {victim} ({self._sizes[victim] / 1e6:.1f} MB)")
+            del self._stores[victim]
+            del self._sizes[victim]
+            del self._uses[victim]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "stores": len(self._stores),
+                "pinned": len(self._pinned),
+                "coalesced_loads": self._loads.coalesced,
+            }